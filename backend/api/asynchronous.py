@@ -0,0 +1,183 @@
+"""
+Асинхронные представления для чтения под ASGI.
+
+Каждое обрабатывает только GET с известными ему параметрами,
+остальное (запись, ?cursor, ?ordering и т.д.) передаётся
+синхронному представлению DRF того же адреса.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import CachedTokenAuthentication, token_cache
+from .mixins import get_cache_headers, get_cache_key
+from .pagination import CustomPagination
+
+
+def accepts(*params):
+    """
+    Параметры запроса, которые асинхронное представление
+    умеет обрабатывать само.
+    """
+    def decorator(handler):
+        handler.params = frozenset(params)
+        return handler
+    return decorator
+
+
+async def alist(queryset):
+    return [item async for item in queryset]
+
+
+def json_response(data, status=200, headers=None):
+    # Тот же вид, что у JSONRenderer DRF: компактно, кириллица как есть.
+    return JsonResponse(
+        data, status=status, headers=headers, safe=False,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def not_found(model):
+    # Тот же текст, что у get_object_or_404 в GenericAPIView.get_object.
+    return exceptions.NotFound(
+        f'No {model._meta.object_name} matches the given query.'
+    )
+
+
+def error_response(error):
+    # Тело как у exception_handler DRF.
+    data = error.detail
+    if not isinstance(data, (list, dict)):
+        data = {'detail': data}
+    response = json_response(data, error.status_code)
+    if isinstance(error, (exceptions.NotAuthenticated,
+                          exceptions.AuthenticationFailed)):
+        response.status_code = 401
+        response['WWW-Authenticate'] = CachedTokenAuthentication.keyword
+    return response
+
+
+async def authenticate(request):
+    """
+    request.user по заголовку Authorization, как у CachedTokenAuthentication.
+    Токен из LRU процесса проверяется без перехода в поток.
+    """
+    authentication = CachedTokenAuthentication()
+    header = get_authorization_header(request).split()
+    if (len(header) == 2
+            and header[0].lower() == authentication.keyword.lower().encode()):
+        key = header[1].decode(errors='replace')
+        snapshot = token_cache.get_local(key)
+        if snapshot is not None:
+            request.user = authentication.from_snapshot(key, snapshot)[0]
+            return
+    result = await sync_to_async(authentication.authenticate)(request)
+    request.user = AnonymousUser() if result is None else result[0]
+
+
+async def cached_response(request, response_cache, handler, args, kwargs):
+    """
+    То же, что CachedResponseMixin.cached_response.
+    """
+    key = get_cache_key(request)
+    entry = await sync_to_async(response_cache.get)(key)
+    cache_status = 'HIT'
+    if entry is None:
+        data = await handler(request, *args, **kwargs)
+        if data is None:
+            return None
+        entry = await sync_to_async(response_cache.set)(key, data)
+        cache_status = 'MISS'
+    headers = get_cache_headers(entry, cache_status)
+    not_modified = get_conditional_response(
+        request,
+        etag=entry.etag,
+        last_modified=int(entry.last_modified)
+    )
+    if not_modified is not None:
+        return HttpResponse(status=not_modified.status_code, headers=headers)
+    return json_response(entry.data, headers=headers)
+
+
+def async_read(handler, sync_view):
+    """
+    Представление для urls: GET с параметрами из handler.params
+    обрабатывает корутина handler, всё остальное — sync_view.
+    handler возвращает данные ответа или None, если запрос
+    лучше отдать sync_view. Кэш ответов тот же, что у sync_view.
+    """
+    params = getattr(handler, 'params', frozenset())
+    view_class = sync_view.cls
+    response_cache = getattr(view_class, 'response_cache', None)
+
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET' and set(request.GET) <= params:
+            try:
+                await authenticate(request)
+                if response_cache is not None and not (
+                        view_class.cache_anonymous_only
+                        and request.user.is_authenticated):
+                    response = await cached_response(
+                        request, response_cache, handler, args, kwargs
+                    )
+                else:
+                    data = await handler(request, *args, **kwargs)
+                    response = None if data is None else json_response(data)
+            except exceptions.APIException as error:
+                return error_response(error)
+            if response is not None:
+                return response
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    # Для меток метрик и бюджетов: те же имена, что у sync_view.
+    view.cls = view_class
+    view.actions = sync_view.actions
+    view.csrf_exempt = True
+    return view
+
+
+class Page:
+    """
+    Параметры page и limit, как у CustomPagination,
+    и ответ в её формате.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.number = request.GET.get(CustomPagination.page_query_param, '1')
+        limit = request.GET.get(CustomPagination.page_size_query_param, '')
+        self.size = (int(limit) if limit.isdigit() and int(limit)
+                     else CustomPagination.page_size)
+        if not self.number.isdigit() or not int(self.number):
+            raise exceptions.NotFound(CustomPagination.invalid_page_message)
+        self.number = int(self.number)
+        self.offset = (self.number - 1) * self.size
+
+    def slice(self, queryset):
+        return queryset[self.offset:self.offset + self.size]
+
+    def get_link(self, number):
+        url = self.request.build_absolute_uri()
+        if number == 1:
+            return remove_query_param(url, CustomPagination.page_query_param)
+        return replace_query_param(
+            url, CustomPagination.page_query_param, number
+        )
+
+    def check(self, count):
+        if self.number > 1 and self.offset >= count:
+            raise exceptions.NotFound(CustomPagination.invalid_page_message)
+
+    def data(self, count, results):
+        return {
+            'count': count,
+            'next': (self.get_link(self.number + 1)
+                     if self.offset + self.size < count else None),
+            'previous': (self.get_link(self.number - 1)
+                         if self.number > 1 else None),
+            'results': results
+        }
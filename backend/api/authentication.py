@@ -0,0 +1,120 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from backend.constants import (AUTH_TOKEN_CACHE_TIMEOUT,
+                               AUTH_TOKEN_LOCAL_SIZE, AUTH_TOKEN_LOCAL_TIMEOUT)
+
+User = get_user_model()
+
+# Хэш пароля в кэш не попадает: поле остаётся отложенным
+# и при обращении читается из БД.
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname != 'password'
+)
+
+
+class TokenCache:
+    """
+    Токен -> снимок полей пользователя.
+
+    Снимки лежат в общем кэше Django и на AUTH_TOKEN_LOCAL_TIMEOUT
+    секунд в LRU процесса. Сигналы удаляют их из общего кэша и из LRU
+    своего процесса, остальные процессы отстают не дольше этого срока.
+    """
+
+    def __init__(self, local_size=AUTH_TOKEN_LOCAL_SIZE):
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_key(self, token_key):
+        digest = hashlib.sha256(token_key.encode()).hexdigest()
+        return f'auth_tokens:{digest}'
+
+    def get_local(self, token_key):
+        """
+        Снимок только из LRU процесса, без обращения к общему кэшу.
+        """
+        key = self.get_key(token_key)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._local.move_to_end(key)
+                return entry[1]
+        return None
+
+    def get(self, token_key):
+        snapshot = self.get_local(token_key)
+        if snapshot is not None:
+            return snapshot
+        key = self.get_key(token_key)
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            self._remember(key, snapshot)
+        return snapshot
+
+    def set(self, token_key, snapshot):
+        key = self.get_key(token_key)
+        cache.set(key, snapshot, AUTH_TOKEN_CACHE_TIMEOUT)
+        self._remember(key, snapshot)
+
+    def invalidate(self, *token_keys):
+        keys = [self.get_key(token_key) for token_key in token_keys]
+        cache.delete_many(keys)
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    def _remember(self, key, snapshot):
+        with self._lock:
+            self._local[key] = (
+                time.monotonic() + AUTH_TOKEN_LOCAL_TIMEOUT, snapshot
+            )
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к БД, если токен уже в кэше.
+    Каждый запрос получает свой экземпляр пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        snapshot = token_cache.get(key)
+        if snapshot is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (
+                token.created,
+                [getattr(user, field) for field in SNAPSHOT_FIELDS]
+            ))
+            return user, token
+        return self.from_snapshot(key, snapshot)
+
+    def from_snapshot(self, key, snapshot):
+        created, values = snapshot
+        user = User.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, values)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        token = Token.from_db(
+            DEFAULT_DB_ALIAS, ('key', 'user_id', 'created'),
+            (key, user.pk, created)
+        )
+        return user, token
@@ -0,0 +1,122 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from backend.constants import (RESPONSE_CACHE_LOCAL_SIZE,
+                               RESPONSE_CACHE_TIMEOUT)
+
+response_caches = {}
+
+
+class ResponseCacheEntry:
+    def __init__(self, data, etag, last_modified):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class ResponseCache:
+    """
+    Кэш ответов API с поколением (версией).
+
+    Поколение и время его появления хранятся в общем кэше Django,
+    сами ответы — там же и в LRU процесса. Любая запись в связанные
+    модели начинает новое поколение, и все старые записи перестают
+    находиться без явного удаления.
+    """
+
+    def __init__(self, name, local_size=RESPONSE_CACHE_LOCAL_SIZE):
+        self.name = name
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        response_caches[name] = self
+
+    @property
+    def version_key(self):
+        return f'responses:{self.name}:version'
+
+    def get_version(self):
+        """
+        Текущее поколение и время его появления.
+        """
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(
+                self.version_key,
+                (uuid.uuid4().hex, time.time()),
+                RESPONSE_CACHE_TIMEOUT
+            )
+            version = cache.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        cache.set(
+            self.version_key,
+            (uuid.uuid4().hex, time.time()),
+            RESPONSE_CACHE_TIMEOUT
+        )
+
+    def get(self, key):
+        version, last_modified = self.get_version()
+        local_key = (version, key)
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is not None:
+                self._local.move_to_end(local_key)
+        if entry is None:
+            data = cache.get(self._shared_key(version, key))
+            if data is not None:
+                entry = self._remember(local_key, data, last_modified)
+        self._count('hits' if entry is not None else 'misses')
+        return entry
+
+    def set(self, key, data):
+        version, last_modified = self.get_version()
+        cache.set(
+            self._shared_key(version, key), data, RESPONSE_CACHE_TIMEOUT
+        )
+        return self._remember((version, key), data, last_modified)
+
+    def get_stats(self):
+        return {
+            counter: cache.get(self._counter_key(counter), 0)
+            for counter in ('hits', 'misses')
+        }
+
+    def _count(self, counter):
+        key = self._counter_key(counter)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, None)
+            cache.incr(key)
+
+    def _counter_key(self, counter):
+        return f'responses:{self.name}:{counter}'
+
+    def _shared_key(self, version, key):
+        digest = hashlib.md5(key.encode()).hexdigest()
+        return f'responses:{self.name}:{version}:{digest}'
+
+    def _remember(self, local_key, data, last_modified):
+        version, key = local_key
+        etag = '"{}"'.format(
+            hashlib.md5(f'{version}:{key}'.encode()).hexdigest()
+        )
+        entry = ResponseCacheEntry(data, etag, last_modified)
+        with self._lock:
+            self._local[local_key] = entry
+            self._local.move_to_end(local_key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+        return entry
+
+
+tag_response_cache = ResponseCache('tags')
+ingredient_response_cache = ResponseCache('ingredients')
+recipe_response_cache = ResponseCache('recipes')
@@ -1,8 +1,16 @@
+from api.recipes.personalization import invalidate_recipe_flags
 from api.recipes.serializers import ShortRecipeReadSerializer
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from favorited.models import Favorite, ShoppingCart
+from favorited.utils import (change_recipe_counter, insert_user_recipes,
+                             refresh_recipe_in_shopping_list,
+                             refresh_recipes_in_shopping_list)
+from recipes.models import Recipe
 from rest_framework import serializers
 
+from backend.constants import BULK_RECIPES_MAX
+
 User = get_user_model()
 
 
@@ -10,31 +18,36 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShoppingCart
         fields = '__all__'
+        # Уникальность (user, recipe) проверяет сама БД при вставке.
+        validators = []
 
-    def validate(self, attrs):
-        if self.context.get(
-                'request'
-        ).method == 'POST' and ShoppingCart.objects.filter(
-            recipe=attrs.get('recipe'),
-            user=attrs.get('user')
-        ).exists():
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                shopping_cart = super().create(validated_data)
+        except IntegrityError:
             raise serializers.ValidationError(
                 {'errors': 'Рецепт уже в списке покупок'}
             )
-        elif not ShoppingCart.objects.filter(
-            recipe=attrs.get('recipe'),
-            user=attrs.get('user')
-        ).exists() and self.context.get('request').method != 'POST':
-            raise serializers.ValidationError(
-                {'errors': 'Рецепта нет в списке покупок'}
-            )
-        return attrs
+        refresh_recipe_in_shopping_list(
+            shopping_cart.user_id,
+            shopping_cart.recipe_id
+        )
+        return shopping_cart
 
     def destroy(self, validated_data):
-        ShoppingCart.objects.filter(
+        deleted, _ = ShoppingCart.objects.filter(
             user=validated_data.get('user'),
             recipe=validated_data.get('recipe')
         ).delete()
+        if not deleted:
+            raise serializers.ValidationError(
+                {'errors': 'Рецепта нет в списке покупок'}
+            )
+        refresh_recipe_in_shopping_list(
+            validated_data.get('user').id,
+            validated_data.get('recipe').id
+        )
 
     def to_representation(self, instance):
         return ShortRecipeReadSerializer(instance.recipe).data
@@ -44,31 +57,109 @@ class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Favorite
         fields = '__all__'
+        validators = []
 
-    def validate(self, attrs):
-        if self.context.get(
-                'request'
-        ).method == 'POST' and Favorite.objects.filter(
-            recipe=attrs.get('recipe'),
-            user=attrs.get('user')
-        ).exists():
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
             raise serializers.ValidationError(
                 {'errors': 'Рецепт уже в избранном'}
             )
-        elif not Favorite.objects.filter(
-            recipe=attrs.get('recipe'),
-            user=attrs.get('user')
-        ).exists() and self.context.get('request').method != 'POST':
-            raise serializers.ValidationError(
-                {'errors': 'Рецепта нет в избранном'}
-            )
-        return attrs
 
     def destroy(self, validated_data):
-        Favorite.objects.filter(
+        deleted, _ = Favorite.objects.filter(
             user=validated_data.get('user'),
             recipe=validated_data.get('recipe')
         ).delete()
+        if not deleted:
+            raise serializers.ValidationError(
+                {'errors': 'Рецепта нет в избранном'}
+            )
 
     def to_representation(self, instance):
         return ShortRecipeReadSerializer(instance.recipe).data
+
+
+class BulkRecipesSerializer(serializers.Serializer):
+    """
+    Добавление и удаление сразу нескольких рецептов.
+    Рецепты проверяются одним запросом, запись — одним
+    INSERT или одним DELETE. Для каждого id возвращается статус.
+    """
+    model = None
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=BULK_RECIPES_MAX
+    )
+
+    def validate_recipes(self, recipes):
+        return list(dict.fromkeys(recipes))
+
+    def get_state(self):
+        recipe_ids = self.validated_data['recipes']
+        user = self.context['request'].user
+        existing = set(Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('id', flat=True))
+        current = set(self.model.objects.filter(
+            user=user,
+            recipe_id__in=existing
+        ).values_list('recipe_id', flat=True))
+        return user, recipe_ids, existing, current
+
+    def changed(self, user, recipe_ids):
+        invalidate_recipe_flags(user.id)
+
+    def add(self):
+        user, recipe_ids, existing, current = self.get_state()
+        with transaction.atomic():
+            # Строки, которые уже добавил параллельный запрос,
+            # не попадут в added и не увеличат счётчик.
+            added = set(insert_user_recipes(
+                self.model, user.id, existing - current
+            ))
+            # Вставка без post_save, DELETE ниже отправляет
+            # post_delete для каждой строки.
+            change_recipe_counter(self.model, added, 1)
+        if added:
+            self.changed(user, added)
+        return self.results(recipe_ids, existing, added, 'added', 'exists')
+
+    def remove(self):
+        user, recipe_ids, existing, current = self.get_state()
+        if current:
+            self.model.objects.filter(
+                user=user,
+                recipe_id__in=current
+            ).delete()
+            self.changed(user, current)
+        return self.results(
+            recipe_ids, existing, current, 'removed', 'missing'
+        )
+
+    def results(self, recipe_ids, existing, changed, done, skipped):
+        return {'results': [
+            {
+                'id': recipe_id,
+                'status': (
+                    'not_found' if recipe_id not in existing
+                    else done if recipe_id in changed
+                    else skipped
+                )
+            } for recipe_id in recipe_ids
+        ]}
+
+
+class BulkShoppingCartSerializer(BulkRecipesSerializer):
+    model = ShoppingCart
+
+    def changed(self, user, recipe_ids):
+        super().changed(user, recipe_ids)
+        refresh_recipes_in_shopping_list(user.id, recipe_ids)
+
+
+class BulkFavoriteSerializer(BulkRecipesSerializer):
+    model = Favorite
@@ -1,10 +1,9 @@
-import base64
-import os
-import uuid
-
-from django.conf import settings
+from django.db.models.fields.files import FieldFile
 from rest_framework import serializers
 
+from .images import (decode_base64_image, get_ready_variant,
+                     save_uploaded_image)
+
 
 class Base64ImageField(serializers.ImageField):
     """
@@ -13,9 +12,30 @@ class Base64ImageField(serializers.ImageField):
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            decoded_image = base64.b64decode(data.split(';base64,')[1])
-            filename = str(uuid.uuid4()) + '.jpg'
-            with open(os.path.join(settings.MEDIA_ROOT, filename), 'wb') as f:
-                f.write(decoded_image)
-            return filename
+            return save_uploaded_image(*decode_base64_image(data))
         return super().to_internal_value(data)
+
+
+class ImageVariantField(serializers.ImageField):
+    """
+    Ссылка на уменьшенный вариант изображения, если он уже готов,
+    иначе на исходник. Вариант можно переопределить через
+    image_variant в контексте сериализатора. Готовые варианты
+    запоминаются, см. get_ready_variant.
+    """
+
+    def __init__(self, variant, **kwargs):
+        self.variant = variant
+        kwargs.setdefault('read_only', True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if value:
+            variant_name = get_ready_variant(
+                value.name,
+                self.context.get('image_variant', self.variant),
+                value.storage
+            )
+            if variant_name is not None:
+                value = FieldFile(value.instance, value.field, variant_name)
+        return super().to_representation(value)
@@ -1,7 +1,10 @@
 import django_filters
-from django.db.models import Exists, OuterRef
+from django.db.models import Count, Exists, OuterRef
 from favorited.models import Favorite, ShoppingCart
-from recipes.models import Ingredient, Recipe
+from recipes.models import Ingredient, IngredientDetail, Recipe, Tag
+from rest_framework.filters import OrderingFilter
+
+from .search import search_ingredients, search_recipes
 
 
 class CustomFilter(django_filters.FilterSet):
@@ -10,16 +13,55 @@ class CustomFilter(django_filters.FilterSet):
     # А to_field_name='slug' не работает
     is_favorited = django_filters.Filter(method='filter_favorited')
     is_in_shopping_cart = django_filters.Filter(method='filter_shopping_cart')
+    search = django_filters.CharFilter(method='filter_search')
+    ingredients = django_filters.Filter(method='filter_by_ingredients')
 
     # BooleanFilter работает только с True False, у нас 1 0 (
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ingredients']
 
     def filter_by_tags(self, queryset, name, value):
-        tags = self.request.GET.getlist('tags')
-        return queryset.filter(tags__slug__in=tags).distinct()
+        """
+        Полусоединение через Exists вместо JOIN + DISTINCT.
+        ?tags_mode=all оставляет рецепты со всеми тегами,
+        по умолчанию достаточно любого из них.
+        """
+        tags = set(self.request.GET.getlist('tags'))
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk')
+        )
+        if self.request.GET.get('tags_mode') == 'all':
+            return queryset.filter(*(
+                Exists(recipe_tags.filter(
+                    tag_id__in=Tag.objects.filter(slug=tag).values('id')
+                )) for tag in tags
+            ))
+        return queryset.filter(Exists(recipe_tags.filter(
+            tag_id__in=Tag.objects.filter(slug__in=tags).values('id')
+        )))
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_by_ingredients(self, queryset, name, value):
+        """
+        ?ingredients=<id>&ingredients=<id> — рецепты, в которых есть
+        все перечисленные ингредиенты (GROUP BY по IngredientDetail).
+        """
+        ingredient_ids = {
+            int(pk) for pk in self.request.GET.getlist('ingredients')
+            if pk.isdigit()
+        }
+        if not ingredient_ids:
+            return queryset
+        return queryset.filter(pk__in=IngredientDetail.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).values('recipe_id').annotate(
+            found=Count('ingredient_id')
+        ).filter(found=len(ingredient_ids)).values('recipe_id'))
 
     def filter_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
@@ -45,8 +87,28 @@ class IngredientFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(method='filter_by_name')
 
     def filter_by_name(self, queryset, name, value):
-        return queryset.filter(name__startswith=value)
+        return search_ingredients(queryset, value)
 
     class Meta:
         model = Ingredient
         fields = ['name']
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """
+    ?ordering=-favorites_count — популярные рецепты.
+    Результаты ?search без ?ordering идут по релевантности.
+    Последним всегда идёт -id, чтобы страницы не пересекались.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if (self.ordering_param not in request.query_params
+                and 'search_rank' in queryset.query.annotations):
+            ordering = ['-search_rank']
+        else:
+            ordering = list(
+                super().get_ordering(request, queryset, view) or ()
+            )
+        if not {'id', '-id'} & set(ordering):
+            ordering.append('-id')
+        return ordering
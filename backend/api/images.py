@@ -0,0 +1,203 @@
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+from backend.constants import (IMAGE_DECODE_CHUNK_SIZE, IMAGE_FORMATS,
+                               IMAGE_MAX_PIXELS, IMAGE_MAX_SIDE,
+                               IMAGE_MAX_UPLOAD_SIZE, IMAGE_VARIANTS)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+# Имена вариантов, которые уже есть в MEDIA_ROOT. Отмечает
+# process_image, в других процессах — первая удачная проверка.
+_ready_variants = set()
+
+
+def get_variant_name(name, variant):
+    """
+    Имя файла варианта: recipe.jpg -> recipe_card.jpg.
+    """
+    stem, extension = os.path.splitext(name)
+    return f'{stem}_{variant}{extension}'
+
+
+def get_ready_variant(name, variant, storage):
+    """
+    Имя готового варианта изображения или None.
+    В хранилище обращается, только пока вариант не отмечен готовым.
+    """
+    variant_name = get_variant_name(name, variant)
+    if variant_name in _ready_variants:
+        return variant_name
+    if storage.exists(variant_name):
+        _ready_variants.add(variant_name)
+        return variant_name
+    return None
+
+
+def decode_base64_chunks(payload):
+    """
+    Декодирует base64 частями по IMAGE_DECODE_CHUNK_SIZE.
+    Пробелы и переводы строк пропускаются, а остаток части
+    не кратный 4 символам переносится в следующую.
+    """
+    rest = ''
+    for start in range(0, len(payload), IMAGE_DECODE_CHUNK_SIZE):
+        chunk = rest + ''.join(
+            payload[start:start + IMAGE_DECODE_CHUNK_SIZE].split()
+        )
+        size = len(chunk) - len(chunk) % 4
+        chunk, rest = chunk[:size], chunk[size:]
+        yield base64.b64decode(chunk)
+    if rest:
+        raise ValueError('Неполные данные base64')
+
+
+def decode_base64_image(data):
+    """
+    Декодирует data:image/...;base64,... по частям во временный файл
+    и проверяет, что это изображение допустимого формата и размера.
+    Возвращает открытый файл, формат по данным Pillow и sha256
+    содержимого.
+    """
+    header, _, payload = data.partition(';base64,')
+    if not payload:
+        raise serializers.ValidationError('Некорректное изображение.')
+    if len(payload) * 3 // 4 > IMAGE_MAX_UPLOAD_SIZE:
+        raise serializers.ValidationError(
+            'Размер изображения не должен превышать '
+            f'{IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)} МБ.'
+        )
+    file = tempfile.SpooledTemporaryFile(max_size=IMAGE_DECODE_CHUNK_SIZE)
+    digest = hashlib.sha256()
+    try:
+        for chunk in decode_base64_chunks(payload):
+            digest.update(chunk)
+            file.write(chunk)
+        file.seek(0)
+        with Image.open(file) as image:
+            image_format = image.format
+            if image.width * image.height > IMAGE_MAX_PIXELS:
+                raise serializers.ValidationError(
+                    'Слишком большое разрешение изображения.'
+                )
+            image.verify()
+    except (ValueError, UnidentifiedImageError, Image.DecompressionBombError):
+        file.close()
+        raise serializers.ValidationError('Некорректное изображение.')
+    except serializers.ValidationError:
+        file.close()
+        raise
+    if image_format not in IMAGE_FORMATS:
+        file.close()
+        raise serializers.ValidationError(
+            'Допустимые форматы: ' + ', '.join(IMAGE_FORMATS)
+        )
+    file.seek(0)
+    return file, image_format, digest.hexdigest()
+
+
+def save_uploaded_image(file, image_format, digest):
+    """
+    Сохраняет загруженное изображение в MEDIA_ROOT под именем
+    из хэша содержимого и ставит в очередь его уменьшение и нарезку
+    вариантов. Одинаковые изображения хранятся один раз.
+
+    Файлы без ссылок удаляет только collect_media, и только
+    старше --min-age. Поэтому у уже сохранённого файла
+    обновляется время изменения: рецепт, который на него
+    сошлётся, ещё не зафиксирован.
+    """
+    filename = f'{digest}.{IMAGE_FORMATS[image_format]}'
+    path = os.path.join(settings.MEDIA_ROOT, filename)
+    with file:
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            else:
+                return filename
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'wb') as f:
+            while chunk := file.read(IMAGE_DECODE_CHUNK_SIZE):
+                f.write(chunk)
+        os.replace(temporary_path, path)
+    # Файл мог быть удалён collect_media вместе с вариантами.
+    _ready_variants.difference_update(get_image_file_names(filename))
+    schedule_image_processing(filename)
+    return filename
+
+
+def get_image_file_names(name):
+    """
+    Исходник и все его варианты.
+    """
+    return [name] + [
+        get_variant_name(name, variant) for variant in IMAGE_VARIANTS
+    ]
+
+
+def save_image(image, path, image_format, max_side):
+    image = image.copy()
+    image.thumbnail((max_side, max_side))
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    temporary_path = f'{path}.tmp'
+    image.save(temporary_path, image_format, quality=85, optimize=True)
+    os.replace(temporary_path, path)
+
+
+def process_image(name):
+    """
+    Уменьшает исходник до IMAGE_MAX_SIDE и сохраняет рядом
+    варианты из IMAGE_VARIANTS. Файлы заменяются атомарно.
+    """
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    with Image.open(path) as image:
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        for variant, max_side in IMAGE_VARIANTS.items():
+            save_image(
+                image,
+                os.path.join(settings.MEDIA_ROOT,
+                             get_variant_name(name, variant)),
+                image_format,
+                max_side
+            )
+        save_image(image, path, image_format, IMAGE_MAX_SIDE)
+    _ready_variants.update(get_image_file_names(name)[1:])
+
+
+def log_processing_error(future):
+    if future.exception() is not None:
+        logger.error('Не удалось обработать изображение',
+                     exc_info=future.exception())
+
+
+def schedule_image_processing(name):
+    """
+    Запускает process_image в пуле потоков, чтобы не держать запрос.
+    При IMAGE_PROCESSING_WORKERS = 0 обработка идёт сразу.
+    """
+    global _executor
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        process_image(name)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='images'
+        )
+    _executor.submit(process_image, name).add_done_callback(
+        log_processing_error
+    )
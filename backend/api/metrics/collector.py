@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework import serializers
+
+from backend.constants import (METRICS_DURATION_BUCKETS,
+                               METRICS_QUERIES_BUCKETS, QUERY_BUDGETS)
+
+logger = logging.getLogger(__name__)
+
+current_request_stats = ContextVar('current_request_stats', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestStats:
+    """
+    Замеры одного запроса: время, запросы к БД и время в них,
+    время сериализации и размер ответа.
+    """
+
+    def __init__(self):
+        self.endpoint = 'unresolved'
+        self.started = time.perf_counter()
+        self.duration = 0
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializer_depth = 0
+        self.response_size = 0
+
+    def finish(self, response):
+        self.duration = time.perf_counter() - self.started
+        if not response.streaming:
+            self.response_size = len(response.content)
+
+
+def track_query(execute, sql, params, many, context):
+    """
+    Обёртка execute_wrapper: считает запрос в замеры текущего запроса.
+    Замеры берутся из контекста, поэтому запросы из sync_to_async
+    в асинхронных представлениях тоже попадают в них.
+    """
+    stats = current_request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+def install_query_tracking(sender, connection, **kwargs):
+    """
+    Обработчик connection_created: у каждого потока своё соединение,
+    обёртка ставится первой, чтобы execute_wrapper() её не снимал.
+    """
+    if track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, track_query)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        position = bisect_left(self.buckets, value)
+        if position < len(self.buckets):
+            self.counts[position] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{bucket:g}', cumulative
+        yield '+Inf', self.count
+
+
+class MetricsCollector:
+    """
+    Метрики запросов процесса в формате Prometheus.
+    Каждый воркер отдаёт свои значения, суммирует их Prometheus.
+    """
+    histograms = (
+        ('request_duration_seconds', 'duration', METRICS_DURATION_BUCKETS,
+         'Время обработки запроса'),
+        ('request_db_queries', 'queries', METRICS_QUERIES_BUCKETS,
+         'Число запросов к БД'),
+    )
+    sums = (
+        ('request_db_seconds', 'db_time', 'Время в запросах к БД'),
+        ('request_serializer_seconds', 'serializer_time',
+         'Время сериализации'),
+        ('response_size_bytes', 'response_size', 'Размер ответа'),
+    )
+
+    def __init__(self, prefix='foodgram'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = defaultdict(int)
+            self._histograms = {}
+            self._sums = defaultdict(float)
+
+    def observe(self, method, status_code, stats):
+        labels = (stats.endpoint, method)
+        with self._lock:
+            self._requests[labels + (str(status_code),)] += 1
+            for name, attribute, buckets, _ in self.histograms:
+                if (name, labels) not in self._histograms:
+                    self._histograms[name, labels] = Histogram(buckets)
+                self._histograms[name, labels].observe(
+                    getattr(stats, attribute)
+                )
+            for name, attribute, _ in self.sums:
+                self._sums[name, labels] += getattr(stats, attribute)
+
+    def render(self):
+        lines = []
+        name = f'{self.prefix}_requests_total'
+        lines += [f'# HELP {name} Число запросов', f'# TYPE {name} counter']
+        with self._lock:
+            for (endpoint, method, code), value in sorted(
+                    self._requests.items()):
+                lines.append(
+                    f'{name}{{endpoint="{endpoint}",method="{method}",'
+                    f'status="{code}"}} {value}'
+                )
+            for metric, _, _, description in self.histograms:
+                name = f'{self.prefix}_{metric}'
+                lines += [f'# HELP {name} {description}',
+                          f'# TYPE {name} histogram']
+                for (key, labels), histogram in sorted(
+                        self._histograms.items()):
+                    if key != metric:
+                        continue
+                    label = 'endpoint="{}",method="{}"'.format(*labels)
+                    for bucket, value in histogram.samples():
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bucket}"}} {value}'
+                        )
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+            for metric, _, description in self.sums:
+                name = f'{self.prefix}_{metric}_total'
+                lines += [f'# HELP {name} {description}',
+                          f'# TYPE {name} counter']
+                for (key, labels), value in sorted(self._sums.items()):
+                    if key == metric:
+                        lines.append(
+                            '{}{{endpoint="{}",method="{}"}} {}'.format(
+                                name, *labels, value
+                            )
+                        )
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = MetricsCollector()
+
+
+def check_query_budget(stats):
+    """
+    Сравнивает число запросов к БД с QUERY_BUDGETS.
+    QUERY_BUDGET_MODE: off, warn (в лог) или raise (для тестов).
+    """
+    budget = QUERY_BUDGETS.get(stats.endpoint)
+    mode = settings.QUERY_BUDGET_MODE
+    if budget is None or mode == 'off' or stats.queries <= budget:
+        return
+    message = (f'{stats.endpoint}: {stats.queries} запросов к БД '
+               f'при бюджете {budget}')
+    if mode == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def timed_data(data):
+    """
+    Оборачивает свойство data сериализатора, чтобы время
+    сериализации попадало в замеры текущего запроса.
+    Вложенные вызовы не считаются повторно.
+    """
+    def wrapper(serializer):
+        stats = current_request_stats.get()
+        if stats is None:
+            return data.fget(serializer)
+        stats.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            stats.serializer_depth -= 1
+            if not stats.serializer_depth:
+                stats.serializer_time += time.perf_counter() - started
+    wrapper.timed = True
+    return property(wrapper)
+
+
+def instrument_serializers():
+    for serializer_class in (serializers.Serializer,
+                             serializers.ListSerializer):
+        if not getattr(serializer_class.data.fget, 'timed', False):
+            serializer_class.data = timed_data(serializer_class.data)
@@ -0,0 +1,60 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .collector import (RequestStats, check_query_budget,
+                        current_request_stats, request_metrics)
+
+
+def get_endpoint(view_func, method):
+    """
+    Имя для меток: RecipeViewSet.list, CustomUserViewSet.subscriptions.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class RequestMetricsMiddleware:
+    """
+    Собирает метрики каждого запроса для /api/metrics/
+    и проверяет бюджет запросов к БД.
+    Под ASGI работает без перехода в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        if request.resolver_match is not None:
+            stats.endpoint = get_endpoint(
+                request.resolver_match.func, request.method.lower()
+            )
+        stats.finish(response)
+        request_metrics.observe(request.method, response.status_code, stats)
+        check_query_budget(stats)
+        return response
@@ -0,0 +1,34 @@
+from api.cache import response_caches
+from api.permissions import IsMetricsScraper
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .collector import request_metrics
+
+
+class CacheStatsView(APIView):
+    """
+    Попадания и промахи кэшей ответов.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            name: response_cache.get_stats()
+            for name, response_cache in response_caches.items()
+        })
+
+
+class PrometheusMetricsView(APIView):
+    """
+    Метрики запросов в текстовом формате Prometheus.
+    """
+    permission_classes = (IsMetricsScraper,)
+
+    def get(self, request):
+        return HttpResponse(
+            request_metrics.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
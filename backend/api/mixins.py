@@ -1,7 +1,30 @@
-from rest_framework import mixins, viewsets
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlencode
+from rest_framework import mixins, status, viewsets
 from rest_framework.response import Response
 
 
+def get_cache_key(request):
+    """
+    Схема, хост, путь и параметры запроса в порядке, не зависящем
+    от клиента. Хост и схема нужны из-за абсолютных ссылок
+    на изображения в ответах.
+    """
+    return request.build_absolute_uri(request.path) + '?' + urlencode(sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in set(values)
+    ))
+
+
+def get_cache_headers(entry, cache_status):
+    return {
+        'ETag': entry.etag,
+        'Last-Modified': http_date(entry.last_modified),
+        'X-Cache': cache_status
+    }
+
+
 class CreateListDestroyMixin(viewsets.GenericViewSet,
                              mixins.CreateModelMixin,
                              mixins.ListModelMixin,
@@ -29,6 +52,10 @@ class PatchModelMixin(mixins.UpdateModelMixin):
         )
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
+        if getattr(instance, '_prefetched_objects_cache', None):
+            # Теги и ингредиенты могли поменяться,
+            # предзагруженные значения больше не актуальны.
+            instance._prefetched_objects_cache = {}
         return Response(serializer.data)
 
 
@@ -36,3 +63,48 @@ class NoPatchMixin(CreateListDestroyMixin,
                    PatchModelMixin,
                    mixins.RetrieveModelMixin):
     pass
+
+
+class CachedResponseMixin:
+    """
+    Миксин для кэширования ответов list и retrieve в response_cache.
+    Клиенту отдаются ETag и Last-Modified для 304 и X-Cache.
+    С cache_anonymous_only кэшируются только ответы анонимам,
+    остальные исключения — в can_cache.
+    """
+    response_cache = None
+    cache_anonymous_only = False
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def can_cache(self, request):
+        return not (self.cache_anonymous_only
+                    and request.user.is_authenticated)
+
+    def cached_response(self, method, request, *args, **kwargs):
+        if not self.can_cache(request):
+            return method(request, *args, **kwargs)
+        key = get_cache_key(request)
+        entry = self.response_cache.get(key)
+        cache_status = 'HIT'
+        if entry is None:
+            response = method(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = self.response_cache.set(key, response.data)
+            cache_status = 'MISS'
+        headers = get_cache_headers(entry, cache_status)
+        not_modified = get_conditional_response(
+            request._request,
+            etag=entry.etag,
+            last_modified=int(entry.last_modified)
+        )
+        if not_modified is not None:
+            return Response(status=not_modified.status_code, headers=headers)
+        return Response(entry.data, headers=headers)
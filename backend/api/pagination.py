@@ -1,7 +1,155 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.db import connections
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+def approximate_count(queryset):
+    """
+    Оценка числа строк по плану запроса вместо COUNT(*).
+    Работает только на Postgres, иначе считает точно.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Пагинация по курсору: следующая страница ищется по ключу
+    сортировки без OFFSET и без COUNT(*).
+
+    Сортировка берётся у OrderingFilter представления
+    (RecipeOrderingFilter добавляет -id, поэтому ключ уникален),
+    без него — view.ordering. В курсоре хранятся значения всех полей
+    сортировки, а не только первого, как в CursorPagination:
+    иначе одинаковые счётчики пришлось бы пропускать через OFFSET.
+
+    count в ответе есть только по запросу:
+    ?count=exact или ?count=approximate (оценка планировщика).
+    """
+    page_size = 5
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        for backend in getattr(view, 'filter_backends', ()):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return tuple(ordering)
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([
+            getattr(instance, field.lstrip('-')) for field in ordering
+        ])
+
+    def get_position_filter(self, ordering, position):
+        """
+        Строки после position при сортировке ordering:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        position_filter = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            position_filter |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return position_filter
+
+    def paginate_queryset(self, queryset, request, view=None):
+        count = request.query_params.get('count')
+        self.count = None
+        if count == 'exact':
+            self.count = queryset.count()
+        elif count == 'approximate':
+            self.count = approximate_count(queryset)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(ordering, position)
+            )
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        previous = position
+        if reverse:
+            self.page.reverse()
+            following, previous = previous, following
+        self.has_next = following is not None
+        self.has_previous = previous is not None
+        self.next_position = following
+        self.previous_position = previous
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    Постраничная пагинация. С параметром ?cursor (в том числе пустым
+    для первой страницы) переключается на KeysetPagination,
+    если на входе QuerySet, а не готовый список.
+    """
     page_size = 5
     page_query_param = 'page'
     page_size_query_param = 'limit'
+    cursor_query_param = KeysetPagination.cursor_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (self.cursor_query_param in request.query_params
+                and isinstance(queryset, QuerySet)):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from djoser.permissions import CurrentUserOrAdminOrReadOnly
 from rest_framework import permissions
 
@@ -22,3 +23,12 @@ class CustomCurrentUserOrAdminOrReadOnly(permissions.IsAuthenticatedOrReadOnly,
             CurrentUserOrAdminOrReadOnly,
             self
         ).has_object_permission(request, view, obj)
+
+
+class IsMetricsScraper(permissions.BasePermission):
+    """
+    Метрики доступны администратору и адресам из METRICS_ALLOWED_IPS.
+    """
+    def has_permission(self, request, view):
+        return (request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+                or request.user.is_staff)
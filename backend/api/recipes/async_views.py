@@ -0,0 +1,93 @@
+import asyncio
+
+from api.asynchronous import Page, accepts, alist, not_found
+from api.filters import CustomFilter
+from api.search import search_ingredients
+from asgiref.sync import sync_to_async
+from django_filters.utils import translate_validation
+from recipes.models import Ingredient, Recipe, Tag
+
+from .personalization import get_recipe_flags, personalize
+from .serializers import IngredientSerializer, TagSerializer
+from .views import render_recipe_fragments
+
+
+async def get_flags(user):
+    if not user.is_authenticated:
+        return None
+    return await sync_to_async(get_recipe_flags)(user)
+
+
+async def render_recipes(request, recipe_ids, action, flags):
+    context = {'request': request}
+    if action == 'list':
+        context['image_variant'] = 'card'
+    fragments = await sync_to_async(render_recipe_fragments)(
+        recipe_ids, request, action, context
+    )
+    if flags is None:
+        return fragments
+    return personalize(fragments, flags)
+
+
+async def tags_list(request):
+    return [TagSerializer(tag).data async for tag in Tag.objects.all()]
+
+
+async def tag_detail(request, pk):
+    tag = await Tag.objects.filter(pk=pk).afirst()
+    if tag is None:
+        raise not_found(Tag)
+    return TagSerializer(tag).data
+
+
+@accepts('name')
+async def ingredients_list(request):
+    queryset = Ingredient.objects.all()
+    name = request.GET.get('name')
+    if name:
+        # Поиск по индексу синхронный: на SQLite он читает БД.
+        ingredients = await sync_to_async(
+            lambda: list(search_ingredients(queryset, name))
+        )()
+    else:
+        ingredients = await alist(queryset)
+    return IngredientSerializer(ingredients, many=True).data
+
+
+@accepts('page', 'limit', 'tags', 'tags_mode', 'author',
+         'is_favorited', 'is_in_shopping_cart')
+async def recipes_list(request):
+    """
+    Число рецептов, id страницы и флаги пользователя
+    запрашиваются одновременно.
+    """
+    page = Page(request)
+    filterset = CustomFilter(
+        request.GET, queryset=Recipe.objects.all(), request=request
+    )
+    # Форма фильтра проверяет author запросом к БД.
+    if not await sync_to_async(filterset.is_valid)():
+        raise translate_validation(filterset.errors)
+    queryset = filterset.qs
+    ids = page.slice(queryset.values_list('id', flat=True))
+    count, recipe_ids, flags = await asyncio.gather(
+        queryset.acount(),
+        alist(ids),
+        get_flags(request.user)
+    )
+    page.check(count)
+    return page.data(
+        count, await render_recipes(request, recipe_ids, 'list', flags)
+    )
+
+
+async def recipe_detail(request, pk):
+    exists, flags = await asyncio.gather(
+        Recipe.objects.filter(pk=pk).aexists(),
+        get_flags(request.user)
+    )
+    if not exists:
+        raise not_found(Recipe)
+    recipes = await render_recipes(request, [pk], 'retrieve', flags)
+    return recipes[0]
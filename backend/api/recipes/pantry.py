@@ -0,0 +1,165 @@
+"""
+Подбор рецептов по продуктам, которые есть дома.
+
+Индекс ингредиент -> рецепты живёт в памяти процесса в виде
+массивов array и строится из IngredientDetail один раз. Изменения
+рецептов записываются в общий кэш как пронумерованные поколения:
+каждый процесс перед поиском дочитывает пропущенные поколения
+и пересобирает только затронутые рецепты.
+"""
+import heapq
+import threading
+from array import array
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.core.cache import cache
+from recipes.models import IngredientDetail
+
+from backend.constants import PANTRY_CHANGES_MAX, PANTRY_CHANGES_TIMEOUT
+
+# id — BigAutoField, поэтому 8 байт на элемент.
+ID_TYPECODE = 'Q'
+GENERATION_KEY = 'pantry:generation'
+
+
+def get_change_key(generation):
+    return f'pantry:changes:{generation}'
+
+
+def load_ingredients(**filters):
+    """
+    {id рецепта: array id ингредиентов} по строкам IngredientDetail.
+    """
+    recipes = defaultdict(lambda: array(ID_TYPECODE))
+    for recipe_id, ingredient_id in IngredientDetail.objects.filter(
+            ingredient__isnull=False, **filters
+    ).values_list('recipe_id', 'ingredient_id').iterator():
+        recipes[recipe_id].append(ingredient_id)
+    return recipes
+
+
+class PantryMatches:
+    """
+    Рецепты с покрытием в порядке убывания доли найденных
+    ингредиентов, затем их числа и id. Срез ранжирует только
+    первые stop рецептов, поэтому пагинатор не сортирует всё.
+    """
+
+    def __init__(self, counts, sizes):
+        self.counts = counts
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(len(self))
+        ranked = heapq.nlargest(
+            stop, self.counts.items(),
+            key=lambda item: (
+                item[1] / self.sizes[item[0]], item[1], item[0]
+            )
+        )
+        return [
+            (recipe_id, found, self.sizes[recipe_id])
+            for recipe_id, found in ranked[start:stop]
+        ]
+
+
+class PantryIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._recipes = {}
+        self._postings = {}
+
+    def get_generation(self):
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            cache.add(GENERATION_KEY, 0, None)
+            generation = cache.get(GENERATION_KEY, 0)
+        return generation
+
+    def record(self, *recipe_ids):
+        """
+        Новое поколение с изменёнными рецептами.
+        Вызывается после коммита транзакции, см. api/signals.py.
+        """
+        try:
+            generation = cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.add(GENERATION_KEY, 0, None)
+            generation = cache.incr(GENERATION_KEY)
+        cache.set(
+            get_change_key(generation), recipe_ids, PANTRY_CHANGES_TIMEOUT
+        )
+
+    def invalidate(self):
+        # Поколение без списка изменений: все процессы пересоберут индекс.
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.add(GENERATION_KEY, 0, None)
+
+    def refresh(self):
+        generation = self.get_generation()
+        if generation == self._generation:
+            return
+        if self._generation is None or not (
+                0 < generation - self._generation <= PANTRY_CHANGES_MAX):
+            return self.rebuild(generation)
+        keys = [
+            get_change_key(number)
+            for number in range(self._generation + 1, generation + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return self.rebuild(generation)
+        self.update(set(chain.from_iterable(changes.values())), generation)
+
+    def rebuild(self, generation):
+        recipes = load_ingredients()
+        postings = defaultdict(lambda: array(ID_TYPECODE))
+        for recipe_id, ingredient_ids in recipes.items():
+            for ingredient_id in ingredient_ids:
+                postings[ingredient_id].append(recipe_id)
+        with self._lock:
+            self._recipes = dict(recipes)
+            self._postings = dict(postings)
+            self._generation = generation
+
+    def update(self, recipe_ids, generation):
+        recipes = load_ingredients(recipe_id__in=recipe_ids)
+        with self._lock:
+            for recipe_id in recipe_ids:
+                for ingredient_id in self._recipes.pop(recipe_id, ()):
+                    self._postings[ingredient_id].remove(recipe_id)
+                if recipe_id not in recipes:
+                    continue
+                self._recipes[recipe_id] = recipes[recipe_id]
+                for ingredient_id in recipes[recipe_id]:
+                    self._postings.setdefault(
+                        ingredient_id, array(ID_TYPECODE)
+                    ).append(recipe_id)
+            self._generation = generation
+
+    def match(self, ingredient_ids):
+        """
+        Рецепты, в которых есть хотя бы один из ingredient_ids.
+        """
+        self.refresh()
+        counts = Counter()
+        with self._lock:
+            counts.update(chain.from_iterable(
+                self._postings.get(ingredient_id, ())
+                for ingredient_id in ingredient_ids
+            ))
+            sizes = {
+                recipe_id: len(self._recipes[recipe_id])
+                for recipe_id in counts
+            }
+        return PantryMatches(counts, sizes)
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,99 @@
+from api.cache import recipe_response_cache
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import IntegerField, Value
+from favorited.models import Favorite, ShoppingCart
+
+from backend.constants import (RECIPE_FLAGS_CACHE_TIMEOUT,
+                               RESPONSE_CACHE_TIMEOUT)
+
+User = get_user_model()
+
+FAVORITED, IN_SHOPPING_CART, SUBSCRIBED = range(3)
+
+
+def get_recipe_flags_key(user_id):
+    return f'recipe_flags:{user_id}'
+
+
+def invalidate_recipe_flags(*user_ids):
+    """
+    Флаги удаляются после коммита транзакции: иначе параллельное
+    чтение снова закэширует ещё старые флаги.
+    """
+    keys = [get_recipe_flags_key(pk) for pk in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_recipe_flags(user):
+    """
+    Избранное, список покупок и подписки пользователя в виде
+    множеств id. Читаются одним UNION-запросом и недолго кэшируются.
+    """
+    key = get_recipe_flags_key(user.pk)
+    flags = cache.get(key)
+    if flags is not None:
+        return flags
+    flags = {FAVORITED: set(), IN_SHOPPING_CART: set(), SUBSCRIBED: set()}
+    rows = Favorite.objects.filter(user=user).annotate(
+        kind=Value(FAVORITED, output_field=IntegerField())
+    ).values_list('kind', 'recipe_id').union(
+        ShoppingCart.objects.filter(user=user).annotate(
+            kind=Value(IN_SHOPPING_CART, output_field=IntegerField())
+        ).values_list('kind', 'recipe_id'),
+        User.subscriptions.through.objects.filter(
+            from_customuser=user
+        ).annotate(
+            kind=Value(SUBSCRIBED, output_field=IntegerField())
+        ).values_list('kind', 'to_customuser_id'),
+        all=True
+    )
+    for kind, pk in rows:
+        flags[kind].add(pk)
+    cache.set(key, flags, RECIPE_FLAGS_CACHE_TIMEOUT)
+    return flags
+
+
+def get_recipe_fragments(recipe_ids, prefix, render):
+    """
+    Общие для всех пользователей представления рецептов.
+
+    Берутся из кэша по id в поколении recipe_response_cache,
+    недостающие строятся render(ids) -> {id: data} одним проходом.
+    """
+    version, _ = recipe_response_cache.get_version()
+    keys = {
+        pk: f'fragments:recipes:{version}:{prefix}:{pk}'
+        for pk in recipe_ids
+    }
+    cached = cache.get_many(keys.values())
+    fragments = {
+        pk: cached[key] for pk, key in keys.items() if key in cached
+    }
+    missing = [pk for pk in recipe_ids if pk not in fragments]
+    if missing:
+        rendered = render(missing)
+        cache.set_many(
+            {keys[pk]: data for pk, data in rendered.items()},
+            RESPONSE_CACHE_TIMEOUT
+        )
+        fragments.update(rendered)
+    return [fragments[pk] for pk in recipe_ids if pk in fragments]
+
+
+def personalize(fragments, flags):
+    """
+    Подставляет флаги пользователя в копии общих представлений.
+    """
+    return [
+        {
+            **fragment,
+            'author': {
+                **fragment['author'],
+                'is_subscribed': fragment['author']['id'] in flags[SUBSCRIBED]
+            },
+            'is_favorited': fragment['id'] in flags[FAVORITED],
+            'is_in_shopping_cart': fragment['id'] in flags[IN_SHOPPING_CART]
+        } for fragment in fragments
+    ]
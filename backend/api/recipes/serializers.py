@@ -1,7 +1,9 @@
-from api.fields import Base64ImageField
+from api.fields import Base64ImageField, ImageVariantField
 from api.users.serializers import CustomUserSerializer
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from favorited.models import Favorite, ShoppingCart
+from favorited.utils import refresh_shopping_lists
 from recipes.models import Ingredient, IngredientDetail, Recipe, Tag
 from rest_framework import serializers
 
@@ -45,28 +47,53 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
 
 
 class ShortRecipeReadSerializer(serializers.ModelSerializer):
+    image = ImageVariantField('card')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class PantryRecipeSerializer(ShortRecipeReadSerializer):
+    coverage = serializers.FloatField()
+    missing = IngredientAmountSerializer(
+        source='missing_ingredients',
+        many=True
+    )
+
+    class Meta(ShortRecipeReadSerializer.Meta):
+        fields = ShortRecipeReadSerializer.Meta.fields + (
+            'coverage', 'missing'
+        )
+
+
+class SimilarRecipeSerializer(ShortRecipeReadSerializer):
+    score = serializers.FloatField()
+
+    class Meta(ShortRecipeReadSerializer.Meta):
+        fields = ShortRecipeReadSerializer.Meta.fields + ('score',)
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     ingredients = serializers.SerializerMethodField()
     tags = TagSerializer(many=True)
     author = CustomUserSerializer()
     is_in_shopping_cart = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
+    image = ImageVariantField('detail')
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        # Счётчики меняются чаще, чем сбрасываются кэши ответов.
+        exclude = ('favorites_count', 'in_carts_count', 'search_vector')
 
     def get_ingredients(self, obj):
-        ingredient_details = IngredientDetail.objects.filter(recipe=obj)
-        serializer = IngredientAmountSerializer(ingredient_details, many=True)
+        serializer = IngredientAmountSerializer(obj.recipe.all(), many=True)
         return serializer.data
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return (
             self.context['request'].user.is_authenticated
             and ShoppingCart.objects.filter(
@@ -76,6 +103,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return (
             self.context['request'].user.is_authenticated
             and Favorite.objects.filter(
@@ -161,9 +190,55 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def tags_create(self, recipe, tags):
-        for tag in tags:
-            recipe.tags.add(tag)
-
+        recipe.tags.add(*tags)
+
+    def ingredients_update(self, recipe, ingredients):
+        """
+        Приводит ингредиенты рецепта к присланным: удаляет лишние,
+        добавляет новые и меняет количество одним запросом на каждое
+        действие. Возвращает id ингредиентов, которые изменились.
+        """
+        current = {
+            detail.ingredient_id: detail
+            for detail in IngredientDetail.objects.filter(recipe=recipe)
+        }
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = current.keys() - amounts.keys()
+        added = amounts.keys() - current.keys()
+        updated = []
+        for ingredient_id in current.keys() & amounts.keys():
+            detail = current[ingredient_id]
+            if detail.amount != amounts[ingredient_id]:
+                detail.amount = amounts[ingredient_id]
+                updated.append(detail)
+        if removed:
+            IngredientDetail.objects.filter(
+                pk__in=[current[ingredient_id].pk for ingredient_id in removed]
+            ).delete()
+        if added:
+            IngredientDetail.objects.bulk_create(
+                IngredientDetail(
+                    ingredient_id=ingredient_id,
+                    recipe=recipe,
+                    amount=amounts[ingredient_id]
+                ) for ingredient_id in added
+            )
+        if updated:
+            IngredientDetail.objects.bulk_update(updated, ('amount',))
+        return removed | added | {detail.ingredient_id for detail in updated}
+
+    def tags_update(self, recipe, tags):
+        current = set(recipe.tags.values_list('id', flat=True))
+        new = {tag.id for tag in tags}
+        if current - new:
+            recipe.tags.remove(*(current - new))
+        if new - current:
+            recipe.tags.add(*(new - current))
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -177,14 +252,20 @@ class RecipeSerializer(serializers.ModelSerializer):
         self.tags_create(recipe, tags)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients', [])
         tags_data = validated_data.pop('tags', [])
-        instance.ingredients.clear()
-        instance.tags.clear()
-
-        self.ingredients_create(ingredients_data, instance)
-        self.tags_create(instance, tags_data)
-        instance.save()
+        changed_ingredient_ids = self.ingredients_update(
+            instance, ingredients_data
+        )
+        self.tags_update(instance, tags_data)
         super().update(instance, validated_data)
+        if changed_ingredient_ids:
+            refresh_shopping_lists(
+                ShoppingCart.objects.filter(
+                    recipe=instance
+                ).values_list('user_id', flat=True),
+                changed_ingredient_ids
+            )
         return instance
@@ -0,0 +1,94 @@
+import csv
+import json
+
+
+class Echo:
+    """
+    Псевдо-файл для csv.writer: возвращает строку вместо записи.
+    """
+
+    def write(self, value):
+        return value
+
+
+class BaseShoppingListFormatter:
+    """
+    Базовый формат выгрузки списка покупок.
+
+    Строки (название, количество, единица измерения) отдаются
+    по одной, поэтому весь список никогда не лежит в памяти целиком.
+    """
+    content_type = 'text/plain; charset=utf-8'
+    extension = 'txt'
+
+    def header(self):
+        return ''
+
+    def row(self, name, amount, measurement_unit):
+        raise NotImplementedError
+
+    def footer(self):
+        return ''
+
+    def stream(self, rows):
+        yield self.header()
+        for row in rows:
+            yield self.row(*row)
+        yield self.footer()
+
+
+class CsvShoppingListFormatter(BaseShoppingListFormatter):
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    def __init__(self):
+        self.writer = csv.writer(Echo())
+
+    def header(self):
+        return self.writer.writerow(
+            ['Ингредиент', 'Количество', 'Единица измерения']
+        )
+
+    def row(self, name, amount, measurement_unit):
+        return self.writer.writerow([name, amount, measurement_unit])
+
+
+class TextShoppingListFormatter(BaseShoppingListFormatter):
+    def header(self):
+        return 'Список покупок\n\n'
+
+    def row(self, name, amount, measurement_unit):
+        return f'{name} ({measurement_unit}) — {amount}\n'
+
+
+class JsonShoppingListFormatter(BaseShoppingListFormatter):
+    content_type = 'application/json'
+    extension = 'json'
+
+    def __init__(self):
+        self.separator = ''
+
+    def header(self):
+        return '['
+
+    def row(self, name, amount, measurement_unit):
+        separator, self.separator = self.separator, ','
+        return separator + json.dumps(
+            {
+                'name': name,
+                'amount': amount,
+                'measurement_unit': measurement_unit
+            },
+            ensure_ascii=False
+        )
+
+    def footer(self):
+        return ']'
+
+
+SHOPPING_LIST_FORMATTERS = {
+    'csv': CsvShoppingListFormatter,
+    'txt': TextShoppingListFormatter,
+    'json': JsonShoppingListFormatter,
+}
+DEFAULT_SHOPPING_LIST_FORMAT = 'csv'
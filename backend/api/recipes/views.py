@@ -1,53 +1,205 @@
-import csv
-
-from api.favorited.serializers import (FavoriteSerializer,
+from api.cache import (ingredient_response_cache, recipe_response_cache,
+                       tag_response_cache)
+from api.favorited.serializers import (BulkFavoriteSerializer,
+                                       BulkShoppingCartSerializer,
+                                       FavoriteSerializer,
                                        ShoppingCartSerializer)
-from api.filters import CustomFilter, IngredientFilter
-from api.mixins import NoPatchMixin
+from api.filters import (CustomFilter, IngredientFilter,
+                         RecipeOrderingFilter)
+from api.mixins import CachedResponseMixin, NoPatchMixin
 from api.permissions import IsAdminIsAuthorReadOnly
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Exists, F, OuterRef, Prefetch, Value
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from favorited.models import ShoppingCart
+from favorited.models import Favorite, ShoppingCart, ShoppingListItem
+from favorited.utils import RECIPE_COUNTERS, refresh_shopping_lists
 from recipes.models import Ingredient, IngredientDetail, Recipe, Tag
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
-from .serializers import (IngredientSerializer, RecipeReadSerializer,
-                          RecipeSerializer, TagSerializer)
+from backend.constants import PANTRY_INGREDIENTS_MAX, SIMILAR_RECIPES_COUNT
+
+from .pantry import pantry_index
+from .personalization import (get_recipe_flags, get_recipe_fragments,
+                              personalize)
+from .serializers import (IngredientSerializer, PantryRecipeSerializer,
+                          RecipeReadSerializer, RecipeSerializer,
+                          SimilarRecipeSerializer, TagSerializer)
+from .shopping_list import (DEFAULT_SHOPPING_LIST_FORMAT,
+                            SHOPPING_LIST_FORMATTERS)
 
 User = get_user_model()
 
+SHOPPING_LIST_CHUNK_SIZE = 500
+
+
+def with_read_data(queryset, user=None):
+    """
+    Рецепты вместе со всем, что нужно RecipeReadSerializer:
+    автор, теги и ингредиенты подгружаются пачкой, а флаги
+    избранного, списка покупок и подписки считаются подзапросами.
+    Количество запросов на страницу не зависит от её размера.
+    Без user флаги всегда False. search_vector нужен только
+    для фильтра поиска и не загружается.
+    """
+    authors = User.objects.all()
+    queryset = queryset.defer('search_vector').prefetch_related(
+        'tags',
+        Prefetch(
+            'recipe',
+            queryset=IngredientDetail.objects.select_related('ingredient')
+        )
+    )
+    if user is None or not user.is_authenticated:
+        return queryset.prefetch_related(
+            Prefetch(
+                'author',
+                queryset=authors.annotate(is_subscribed=Value(False))
+            )
+        ).annotate(
+            is_favorited=Value(False),
+            is_in_shopping_cart=Value(False)
+        )
+    return queryset.prefetch_related(
+        Prefetch(
+            'author',
+            queryset=authors.annotate(is_subscribed=Exists(
+                user.subscriptions.filter(pk=OuterRef('pk'))
+            ))
+        )
+    ).annotate(
+        is_favorited=Exists(Favorite.objects.filter(
+            user=user,
+            recipe=OuterRef('pk')
+        )),
+        is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+            user=user,
+            recipe=OuterRef('pk')
+        ))
+    )
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+def render_recipe_fragments(recipe_ids, request, action, context):
+    """
+    Общие для всех пользователей представления рецептов
+    в порядке recipe_ids, см. get_recipe_fragments.
+    """
+    def render(ids):
+        recipes = with_read_data(Recipe.objects.filter(pk__in=ids))
+        return {
+            data['id']: data for data in RecipeReadSerializer(
+                recipes, many=True, context=context
+            ).data
+        }
+
+    return get_recipe_fragments(
+        recipe_ids, f'{request.scheme}:{request.get_host()}:{action}',
+        render
+    )
+
+
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    response_cache = tag_response_cache
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
+    response_cache = ingredient_response_cache
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
 
-class RecipeViewSet(NoPatchMixin):
+class RecipeViewSet(CachedResponseMixin, NoPatchMixin):
     queryset = Recipe.objects.all()
+    response_cache = recipe_response_cache
+    cache_anonymous_only = True
     serializer_class = RecipeSerializer
     permission_classes = (IsAdminIsAuthorReadOnly,
                           permissions.IsAuthenticatedOrReadOnly)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = CustomFilter
+    ordering_fields = ('favorites_count', 'in_carts_count', 'id')
+    ordering = ('-id',)
+
+    def can_cache(self, request):
+        """
+        Счётчики меняются через UPDATE без сигналов и не начинают
+        новое поколение кэша, поэтому ответы с сортировкой
+        по ним не кэшируются.
+        """
+        ordering = request.query_params.get(
+            RecipeOrderingFilter.ordering_param, ''
+        )
+        return super().can_cache(request) and not {
+            field.strip().lstrip('-') for field in ordering.split(',')
+        } & set(RECIPE_COUNTERS.values())
+
+    def is_personalized(self):
+        """
+        Чтение авторизованным пользователем собирается из общих
+        фрагментов и флагов пользователя, см. personalization.
+        """
+        return (self.action in ('list', 'retrieve')
+                and self.request.user.is_authenticated)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.is_personalized():
+            return queryset.only('id')
+        return with_read_data(queryset, self.request.user)
+
+    def render_recipes(self, recipe_ids):
+        fragments = render_recipe_fragments(
+            recipe_ids, self.request, self.action,
+            self.get_serializer_context()
+        )
+        return personalize(fragments, get_recipe_flags(self.request.user))
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_personalized():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        recipes = queryset if page is None else page
+        data = self.render_recipes([recipe.id for recipe in recipes])
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.is_personalized():
+            return super().retrieve(request, *args, **kwargs)
+        return Response(self.render_recipes([self.get_object().id])[0])
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list':
+            context['image_variant'] = 'card'
+        return context
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
             return RecipeReadSerializer
         return super().get_serializer_class()
 
+    def perform_destroy(self, instance):
+        user_ids = list(ShoppingCart.objects.filter(
+            recipe=instance
+        ).values_list('user_id', flat=True))
+        ingredient_ids = list(instance.ingredients.values_list(
+            'id', flat=True
+        ))
+        super().perform_destroy(instance)
+        refresh_shopping_lists(user_ids, ingredient_ids)
+
     @action(detail=True, methods=['post'],
             permission_classes=[permissions.IsAuthenticatedOrReadOnly])
     def shopping_cart(self, request, pk=None):
@@ -70,21 +222,14 @@ class RecipeViewSet(NoPatchMixin):
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk=None):
-        data = {
-            'recipe': self.get_object().id,
-            'user': request.user.id
-        }
-        serializer = ShoppingCartSerializer(
-            data=data,
+        ShoppingCartSerializer(
             context={
                 'request': request
             }
-        )
-        if serializer.is_valid():
-            serializer.destroy(serializer.validated_data)
-        else:
-            return Response(data=serializer.errors,
-                            status=status.HTTP_400_BAD_REQUEST)
+        ).destroy({
+            'recipe': get_object_or_404(Recipe.objects.only('id'), pk=pk),
+            'user': request.user
+        })
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post'],
@@ -109,49 +254,144 @@ class RecipeViewSet(NoPatchMixin):
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk=None):
-        data = {
-            'recipe': self.get_object().id,
-            'user': request.user.id
-        }
-        serializer = FavoriteSerializer(
-            data=data,
+        FavoriteSerializer(
             context={
                 'request': request
             }
-        )
-        if serializer.is_valid():
-            serializer.destroy(serializer.validated_data)
-        else:
-            return Response(data=serializer.errors,
-                            status=status.HTTP_400_BAD_REQUEST)
+        ).destroy({
+            'recipe': get_object_or_404(Recipe.objects.only('id'), pk=pk),
+            'user': request.user
+        })
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def bulk_response(self, serializer_class, method):
+        serializer = serializer_class(
+            data=self.request.data,
+            context={
+                'request': self.request
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response(getattr(serializer, method)(),
+                        status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='shopping_cart',
+            permission_classes=[permissions.IsAuthenticated])
+    def bulk_shopping_cart(self, request):
+        return self.bulk_response(BulkShoppingCartSerializer, 'add')
+
+    @bulk_shopping_cart.mapping.delete
+    def bulk_delete_shopping_cart(self, request):
+        return self.bulk_response(BulkShoppingCartSerializer, 'remove')
+
+    @action(detail=False, methods=['post'], url_path='favorite',
+            permission_classes=[permissions.IsAuthenticated])
+    def bulk_favorite(self, request):
+        return self.bulk_response(BulkFavoriteSerializer, 'add')
+
+    @bulk_favorite.mapping.delete
+    def bulk_delete_favorite(self, request):
+        return self.bulk_response(BulkFavoriteSerializer, 'remove')
+
     def get_shopping_list_ingredients(self):
-        shopping_list = ShoppingCart.objects.filter(
-            user_id=self.request.user
-        ).values('recipe_id')
-        ingredient_details = IngredientDetail.objects.filter(
-            recipe_id__in=shopping_list
-        ).values('ingredient__name',
-                 'ingredient__measurement_unit').annotate(
-            total_amount=Sum('amount'))
-        ingredients_list = [
-            [ingredient['ingredient__name'], ingredient['total_amount'],
-             ingredient['ingredient__measurement_unit']]
-            for ingredient in ingredient_details
-        ]
-        return ingredients_list
+        """
+        Готовый список покупок пользователя из ShoppingListItem.
+        Строки читаются курсором на сервере по мере отправки ответа.
+        """
+        return ShoppingListItem.objects.filter(
+            user=self.request.user
+        ).order_by('ingredient__name').values_list(
+            'ingredient__name',
+            'amount',
+            'ingredient__measurement_unit'
+        ).iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
 
     @action(methods=['get'],
             detail=False,
             permission_classes=[permissions.IsAuthenticated])
     def download_shopping_cart(self, request):
-        cart_list = self.get_shopping_list_ingredients()
-        response = HttpResponse(content_type='text/plain')
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename="shopping_list.txt"')
-        writer = csv.writer(response)
-        writer.writerow(['Ингредиент', 'Количество', 'Единица измерения'])
-        for ingredient in cart_list:
-            writer.writerow(ingredient)
+        file_format = request.query_params.get(
+            'type', DEFAULT_SHOPPING_LIST_FORMAT
+        )
+        if file_format not in SHOPPING_LIST_FORMATTERS:
+            return Response(
+                {'errors': 'Доступные форматы: '
+                           + ', '.join(SHOPPING_LIST_FORMATTERS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        formatter = SHOPPING_LIST_FORMATTERS[file_format]()
+        response = StreamingHttpResponse(
+            formatter.stream(self.get_shopping_list_ingredients()),
+            content_type=formatter.content_type
+        )
+        response['Content-Disposition'] = (
+            'attachment; '
+            f'filename="shopping_list.{formatter.extension}"'
+        )
         return response
+
+    @action(methods=['get'], detail=False)
+    def pantry(self, request):
+        """
+        Что приготовить из того, что есть:
+        ?ingredients=<id>&ingredients=<id>.
+
+        Рецепты по убыванию доли ингредиентов, которые уже есть
+        (coverage), с недостающими ингредиентами (missing).
+        Кандидаты и их ранжирование берутся из pantry_index,
+        из БД читается только страница.
+        """
+        ingredient_ids = {
+            int(pk) for pk in request.query_params.getlist('ingredients')
+            if pk.isdigit()
+        }
+        if not 0 < len(ingredient_ids) <= PANTRY_INGREDIENTS_MAX:
+            return Response(
+                {'errors': 'Укажите от 1 до '
+                           f'{PANTRY_INGREDIENTS_MAX} ингредиентов'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        page = self.paginate_queryset(pantry_index.match(ingredient_ids))
+        recipes = Recipe.objects.defer('search_vector').prefetch_related(
+            Prefetch(
+                'recipe',
+                queryset=IngredientDetail.objects.filter(
+                    ingredient__isnull=False
+                ).exclude(
+                    ingredient_id__in=ingredient_ids
+                ).select_related('ingredient'),
+                to_attr='missing_ingredients'
+            )
+        ).in_bulk([recipe_id for recipe_id, _, _ in page])
+        results = []
+        for recipe_id, found, total in page:
+            # Рецепт мог быть удалён после построения индекса.
+            if recipe_id in recipes:
+                recipe = recipes[recipe_id]
+                recipe.coverage = found / total
+                results.append(recipe)
+        return self.get_paginated_response(PantryRecipeSerializer(
+            results, many=True, context=self.get_serializer_context()
+        ).data)
+
+    @action(methods=['get'], detail=True)
+    def similar(self, request, pk=None):
+        """
+        Похожие рецепты по общим ингредиентам и тегам, ?limit=<n>.
+
+        Соседи заранее посчитаны в SimilarRecipe (recipes.utils),
+        после проверки рецепта они читаются одним запросом
+        по индексу (recipe, -score).
+        """
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        limit = request.query_params.get('limit', '')
+        limit = min(int(limit) if limit.isdigit() else SIMILAR_RECIPES_COUNT,
+                    SIMILAR_RECIPES_COUNT)
+        recipes = Recipe.objects.defer('search_vector').filter(
+            similar_to__recipe=recipe
+        ).annotate(
+            score=F('similar_to__score')
+        ).order_by('-score', '-id')[:limit]
+        return Response(SimilarRecipeSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        ).data)
@@ -0,0 +1,244 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramWordSimilarity)
+from django.db import connection
+from django.db.models import (Case, F, FloatField, IntegerField, Q, Value,
+                              When)
+from recipes.models import Ingredient, Recipe
+
+from backend.constants import (INGREDIENT_SEARCH_LIMIT,
+                               INGREDIENT_SEARCH_SIMILARITY,
+                               RECIPE_SEARCH_CONFIG, RECIPE_SEARCH_ENDINGS,
+                               RECIPE_SEARCH_LIMIT, RECIPE_SEARCH_WEIGHTS)
+
+from .cache import ingredient_response_cache, recipe_response_cache
+
+WORD_RE = re.compile(r'\w+')
+
+
+def trigrams(text):
+    """
+    Триграммы слова по правилам pg_trgm: нижний регистр,
+    два пробела в начале и один в конце.
+    """
+    padded = f'  {text.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def word_similarity(query_trigrams, words_trigrams):
+    """
+    Лучшее сходство запроса с одним из слов названия.
+    """
+    best = 0
+    for word_trigrams in words_trigrams:
+        best = max(
+            best,
+            len(query_trigrams & word_trigrams)
+            / len(query_trigrams | word_trigrams)
+        )
+    return best
+
+
+class IngredientSearchIndex:
+    """
+    Индекс ингредиентов в памяти процесса для баз без pg_trgm.
+
+    Названия хранятся отсортированными в нижнем регистре:
+    префикс ищется бинарным поиском, вхождение и нечёткое
+    совпадение — проходом по ~2 тыс. строк без запросов к БД.
+    Индекс строится заново, когда меняется поколение
+    ingredient_response_cache, в том числе в других процессах.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = None
+
+    def get_entries(self):
+        version, _ = ingredient_response_cache.get_version()
+        if self._version == version:
+            return self._entries
+        entries = sorted(
+            (name.lower(), pk, [trigrams(word) for word in name.split()])
+            for pk, name in Ingredient.objects.values_list('pk', 'name')
+        )
+        with self._lock:
+            self._entries = entries
+            self._version = version
+        return entries
+
+    def search(self, value, limit):
+        entries = self.get_entries()
+        value = value.lower()
+        result = []
+        start = bisect_left(entries, (value,))
+        for name, pk, _ in entries[start:]:
+            if not name.startswith(value) or len(result) >= limit:
+                break
+            result.append(pk)
+        if len(result) >= limit:
+            return result
+        contains = sorted(
+            (position, name, pk) for position, name, pk in (
+                (name.find(value), name, pk) for name, pk, _ in entries
+            ) if position > 0
+        )
+        result.extend(pk for _, _, pk in contains[:limit - len(result)])
+        if len(result) >= limit:
+            return result
+        found = set(result)
+        query_trigrams = trigrams(value)
+        similar = []
+        for name, pk, words_trigrams in entries:
+            if pk in found:
+                continue
+            similarity = word_similarity(query_trigrams, words_trigrams)
+            if similarity >= INGREDIENT_SEARCH_SIMILARITY:
+                similar.append((-similarity, name, pk))
+        result.extend(pk for _, _, pk in sorted(similar)[:limit - len(result)])
+        return result
+
+
+ingredient_search_index = IngredientSearchIndex()
+
+
+def search_ingredients(queryset, value, limit=INGREDIENT_SEARCH_LIMIT):
+    """
+    Поиск ингредиентов для автодополнения.
+
+    Сначала совпадения по началу названия, затем по вхождению,
+    затем нечёткие; без учёта регистра, не больше limit строк.
+    """
+    if connection.vendor == 'postgresql':
+        # Порог задаётся явно: у оператора %> pg_trgm свой (0.6),
+        # а индекс в памяти использует INGREDIENT_SEARCH_SIMILARITY.
+        return queryset.annotate(
+            similarity=TrigramWordSimilarity(value, 'name')
+        ).filter(
+            Q(name__icontains=value)
+            | Q(similarity__gte=INGREDIENT_SEARCH_SIMILARITY)
+        ).annotate(
+            rank=Case(
+                When(name__istartswith=value, then=Value(0)),
+                When(name__icontains=value, then=Value(1)),
+                default=Value(2),
+                output_field=IntegerField()
+            )
+        ).order_by('rank', '-similarity', 'name')[:limit]
+    ids = ingredient_search_index.search(value, limit)
+    return queryset.filter(pk__in=ids).order_by(
+        Case(
+            *(When(pk=pk, then=Value(position))
+              for position, pk in enumerate(ids)),
+            output_field=IntegerField()
+        )
+    )
+
+
+def stem(word):
+    """
+    Грубая замена стеммеру Postgres: нижний регистр, е вместо ё
+    и без одного окончания, если от слова остаётся хотя бы три буквы.
+    """
+    word = word.lower().replace('ё', 'е')
+    for ending in RECIPE_SEARCH_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    # Слова короче трёх букв — в основном предлоги и союзы,
+    # которые Postgres тоже пропускает. Числа остаются.
+    return [
+        stem(word) for word in WORD_RE.findall(text)
+        if len(word) >= 3 or word.isdigit()
+    ]
+
+
+class RecipeSearchIndex:
+    """
+    Инвертированный индекс рецептов в памяти процесса для баз
+    без полнотекстового поиска.
+
+    Основа слова -> {id рецепта: вес}, вес складывается из
+    RECIPE_SEARCH_WEIGHTS за каждое вхождение в название и описание.
+    Индекс строится заново, когда меняется поколение
+    recipe_response_cache, то есть после любой правки рецептов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._postings = None
+
+    def get_postings(self):
+        version, _ = recipe_response_cache.get_version()
+        if self._version == version:
+            return self._postings
+        name_weight, text_weight = RECIPE_SEARCH_WEIGHTS
+        postings = defaultdict(lambda: defaultdict(float))
+        for pk, name, text in Recipe.objects.values_list(
+                'pk', 'name', 'text').iterator():
+            for weight, field in ((name_weight, name), (text_weight, text)):
+                for token in tokenize(field):
+                    postings[token][pk] += weight
+        with self._lock:
+            self._postings = postings
+            self._version = version
+        return postings
+
+    def search(self, value, limit):
+        """
+        Рецепты со всеми словами запроса: [(id, вес)] по убыванию веса.
+        """
+        terms = set(tokenize(value))
+        if not terms:
+            return []
+        postings = self.get_postings()
+        # Пересечение начинается с самого редкого слова.
+        terms = sorted(terms, key=lambda term: len(postings.get(term, ())))
+        scores = dict(postings.get(terms[0], {}))
+        for term in terms[1:]:
+            documents = postings.get(term, {})
+            scores = {
+                pk: score + documents[pk]
+                for pk, score in scores.items() if pk in documents
+            }
+        return heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], item[0])
+        )
+
+
+recipe_search_index = RecipeSearchIndex()
+
+
+def search_recipes(queryset, value):
+    """
+    Полнотекстовый поиск рецептов по названию и описанию.
+
+    Остаются рецепты со всеми словами запроса, релевантность
+    в аннотации search_rank. На Postgres — search_vector с GIN-индексом,
+    на остальных БД — recipe_search_index (не больше RECIPE_SEARCH_LIMIT).
+    """
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(
+            value, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+    results = recipe_search_index.search(value, RECIPE_SEARCH_LIMIT)
+    return queryset.filter(pk__in=[pk for pk, _ in results]).annotate(
+        search_rank=Case(
+            *(When(pk=pk, then=Value(score)) for pk, score in results),
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    )
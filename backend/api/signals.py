@@ -0,0 +1,146 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from favorited.models import Favorite, ShoppingCart
+from recipes.models import (Ingredient, IngredientDetail, Recipe,
+                            SimilarRecipe, Tag)
+from recipes.utils import similar_recipes_queue
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .cache import (ingredient_response_cache, recipe_response_cache,
+                    tag_response_cache)
+from .recipes.pantry import pantry_index
+from .recipes.personalization import invalidate_recipe_flags
+
+User = get_user_model()
+
+# Поля автора в ответах с рецептами, см. CustomUserSerializer.
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+def invalidate_on_commit(*response_caches):
+    """
+    Новое поколение начинается после коммита транзакции: иначе
+    параллельное чтение закэширует в нём ещё старые данные.
+    """
+    def invalidate():
+        for response_cache in response_caches:
+            response_cache.invalidate()
+
+    transaction.on_commit(invalidate)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_catalog(**kwargs):
+    invalidate_on_commit(ingredient_response_cache, recipe_response_cache)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_catalog(**kwargs):
+    invalidate_on_commit(tag_response_cache, recipe_response_cache)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientDetail)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipes(**kwargs):
+    invalidate_on_commit(recipe_response_cache)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientDetail)
+def refresh_pantry_index(instance, **kwargs):
+    """
+    Ингредиенты рецепта пишутся пачкой после сохранения рецепта,
+    поэтому изменение фиксируется после коммита транзакции.
+    """
+    recipe_id = (instance.pk if isinstance(instance, Recipe)
+                 else instance.recipe_id)
+    transaction.on_commit(lambda: pantry_index.record(recipe_id))
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_similar_to_saved(instance, **kwargs):
+    """
+    Теги и ингредиенты сохраняются в той же транзакции,
+    что и рецепт, в API и в админке.
+    """
+    transaction.on_commit(lambda: similar_recipes_queue.add([instance.pk]))
+
+
+@receiver(pre_delete, sender=Recipe)
+def refresh_similar_to_deleted(instance, **kwargs):
+    # После удаления строки с рецептом в соседях уже не найти.
+    recipe_ids = list(SimilarRecipe.objects.filter(
+        similar=instance
+    ).values_list('recipe_id', flat=True))
+    transaction.on_commit(lambda: similar_recipes_queue.add(recipe_ids))
+
+
+@receiver(pre_save, sender=User)
+def check_author_fields(instance, update_fields=None, **kwargs):
+    """
+    Вход пользователя обновляет только last_login, смена пароля —
+    поля, которых нет в ответах, поэтому сохранённые поля автора
+    сравниваются с новыми.
+    """
+    instance.author_changed = False
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+            AUTHOR_FIELDS):
+        return
+    instance.author_changed = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*AUTHOR_FIELDS).first() != tuple(
+        getattr(instance, field) for field in AUTHOR_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_recipe_authors(instance, created, **kwargs):
+    # У нового пользователя ещё нет рецептов.
+    if not created and instance.author_changed:
+        invalidate_on_commit(recipe_response_cache)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, update_fields=None, **kwargs):
+    """
+    Смена пароля, блокировка и правка профиля сбрасывают
+    закэшированные снимки пользователя.
+    """
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        token_cache.invalidate(*Token.objects.filter(
+            user=instance
+        ).values_list('key', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    # Выход через djoser удаляет токен.
+    token_cache.invalidate(instance.key)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_user_recipe_flags(instance, **kwargs):
+    invalidate_recipe_flags(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.subscriptions.through)
+def invalidate_subscriber_flags(instance, action, reverse, pk_set,
+                                **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_recipe_flags(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        invalidate_recipe_flags(*pk_set)
+    elif action == 'pre_clear':
+        # После очистки подписчиков уже не найти.
+        invalidate_recipe_flags(*instance.subscription.values_list(
+            'pk', flat=True
+        ))
@@ -49,6 +49,12 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return self.to_representation(self.instance)
 
     def get_recipes(self, obj):
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is not None:
+            return ShortRecipeReadSerializer(
+                recipes_by_author[obj.id],
+                many=True
+            ).data
         recipes = Recipe.objects.filter(author=obj)
         recipes_limit = self.context.get(
             'request'
@@ -59,4 +65,6 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return recipes_data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj).count()
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from favorited.models import Favorite
+from favorited.utils import change_recipe_counter
+from recipes.models import Recipe
+from rest_framework.test import APITestCase
+
+from api.recipes.personalization import (FAVORITED, get_recipe_flags,
+                                         get_recipe_flags_key)
+
+User = get_user_model()
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeResponseCacheTest(APITestCase):
+    """
+    Кэш ответов рецептов анонимам.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author,
+                name=f'Рецепт {number}',
+                text='Описание',
+                image='recipes/images/recipe.png',
+                cooking_time=10
+            ) for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached(self):
+        self.assertEqual(self.client.get(RECIPES_URL)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(RECIPES_URL)['X-Cache'], 'HIT')
+
+    def test_counter_ordering_not_cached(self):
+        url = f'{RECIPES_URL}?ordering=-favorites_count'
+        response = self.client.get(url)
+        self.assertNotIn('X-Cache', response)
+        self.assertEqual(response.data['results'][0]['id'],
+                         self.recipes[-1].pk)
+        change_recipe_counter(Favorite, [self.recipes[0].pk], 1)
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['id'],
+                         self.recipes[0].pk)
+
+    @override_settings(ALLOWED_HOSTS=['a.example', 'b.example'])
+    def test_key_includes_host(self):
+        url = f'{RECIPES_URL}{self.recipes[0].pk}/'
+        for host in ('a.example', 'b.example'):
+            response = self.client.get(url, HTTP_HOST=host)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertTrue(
+                response.data['image'].startswith(f'http://{host}/')
+            )
+        self.assertEqual(
+            self.client.get(url, HTTP_HOST='a.example')['X-Cache'], 'HIT'
+        )
+
+    def test_flags_invalidated_after_commit(self):
+        key = get_recipe_flags_key(self.author.pk)
+        self.assertEqual(get_recipe_flags(self.author)[FAVORITED], set())
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Favorite.objects.create(user=self.author, recipe=self.recipes[0])
+            self.assertIsNotNone(cache.get(key))
+        self.assertTrue(callbacks)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(
+            get_recipe_flags(self.author)[FAVORITED], {self.recipes[0].pk}
+        )
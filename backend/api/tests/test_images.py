@@ -0,0 +1,111 @@
+import base64
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework import serializers
+
+from api import images
+from api.images import (decode_base64_image, get_ready_variant,
+                        get_variant_name, save_uploaded_image)
+from backend.constants import IMAGE_DECODE_CHUNK_SIZE
+
+
+def make_png(width=200, height=200):
+    # Шум почти не сжимается: base64 длиннее нескольких частей.
+    image = Image.frombytes('RGB', (width, height),
+                            os.urandom(width * height * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class DecodeBase64ImageTest(SimpleTestCase):
+    """
+    Декодирование data:image/...;base64 по частям.
+    """
+
+    def setUp(self):
+        self.content = make_png()
+
+    def decode(self, payload):
+        file, image_format, digest = decode_base64_image(
+            f'data:image/png;base64,{payload}'
+        )
+        with file:
+            self.assertEqual(file.read(), self.content)
+        self.assertEqual(image_format, 'PNG')
+        self.assertEqual(digest, hashlib.sha256(self.content).hexdigest())
+
+    def test_several_chunks(self):
+        payload = base64.b64encode(self.content).decode()
+        self.assertGreater(len(payload), 2 * IMAGE_DECODE_CHUNK_SIZE)
+        self.decode(payload)
+
+    def test_wrapped_lines(self):
+        self.decode(base64.encodebytes(self.content).decode())
+
+    def test_wrapped_crlf(self):
+        self.decode(
+            base64.encodebytes(self.content).decode().replace('\n', '\r\n')
+        )
+
+    def test_truncated(self):
+        payload = base64.b64encode(self.content).decode()[:-3]
+        with self.assertRaises(serializers.ValidationError):
+            decode_base64_image(f'data:image/png;base64,{payload}')
+
+
+class ReadyVariantTest(SimpleTestCase):
+    """
+    Готовые варианты изображения запоминаются после обработки.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root,
+                                     IMAGE_PROCESSING_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.storage = FileSystemStorage(location=self.media_root)
+        ready_variants = mock.patch.object(images, '_ready_variants', set())
+        ready_variants.start()
+        self.addCleanup(ready_variants.stop)
+
+    def save(self):
+        file, image_format, digest = decode_base64_image(
+            'data:image/png;base64,'
+            + base64.b64encode(make_png(40, 40)).decode()
+        )
+        return save_uploaded_image(file, image_format, digest)
+
+    def test_marked_after_processing(self):
+        name = self.save()
+        with mock.patch.object(self.storage, 'exists') as exists:
+            self.assertEqual(get_ready_variant(name, 'card', self.storage),
+                             get_variant_name(name, 'card'))
+        exists.assert_not_called()
+
+    def test_checked_once(self):
+        name = self.save()
+        images._ready_variants.clear()
+        with mock.patch.object(self.storage, 'exists',
+                               wraps=self.storage.exists) as exists:
+            for _ in range(3):
+                self.assertEqual(
+                    get_ready_variant(name, 'card', self.storage),
+                    get_variant_name(name, 'card')
+                )
+        exists.assert_called_once()
+
+    def test_missing_variant(self):
+        self.assertIsNone(
+            get_ready_variant('missing.png', 'card', self.storage)
+        )
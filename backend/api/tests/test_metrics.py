@@ -0,0 +1,43 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
+from recipes.models import Tag
+from rest_framework.test import APITestCase
+
+from api.metrics import collector
+from api.metrics.collector import QueryBudgetExceeded
+
+TAGS_URL = '/api/tags/'
+
+
+class QueryBudgetTest(APITestCase):
+    """
+    В тестах превышение QUERY_BUDGETS — ошибка.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_raise_in_tests(self):
+        self.assertEqual(settings.QUERY_BUDGET_MODE, 'raise')
+
+    def test_within_budget(self):
+        self.assertEqual(self.client.get(TAGS_URL).status_code, 200)
+
+    def test_exceeded(self):
+        with mock.patch.dict(collector.QUERY_BUDGETS, {'TagViewSet.list': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(TAGS_URL)
+
+    @override_settings(QUERY_BUDGET_MODE='warn')
+    def test_warn(self):
+        with mock.patch.dict(collector.QUERY_BUDGETS, {'TagViewSet.list': 0}):
+            with self.assertLogs(collector.logger, 'WARNING'):
+                response = self.client.get(TAGS_URL)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from recipes.models import Recipe
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+RECIPES_URL = '/api/recipes/'
+
+
+class KeysetPaginationTest(APITestCase):
+    """
+    ?cursor сохраняет сортировку ?ordering, страницы не пересекаются
+    и при одинаковых счётчиках.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {number}',
+                text='Описание',
+                image='recipes/images/recipe.png',
+                cooking_time=10
+            ) for number in range(12)
+        ]
+        for number, recipe in enumerate(cls.recipes):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                favorites_count=number % 3
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url, link='next'):
+        """
+        Страницы по ссылкам link: [(url, [id рецептов])].
+        """
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append((url, [
+                recipe['id'] for recipe in response.data['results']
+            ]))
+            url = response.data[link]
+        return pages
+
+    def test_cursor_keeps_ordering(self):
+        pages = self.walk(f'{RECIPES_URL}?cursor=&ordering=-favorites_count')
+        self.assertEqual(
+            [pk for _, ids in pages for pk in ids],
+            [
+                recipe.pk for number, recipe in sorted(
+                    enumerate(self.recipes),
+                    key=lambda item: (-(item[0] % 3), -item[1].pk)
+                )
+            ]
+        )
+
+    def test_previous_pages(self):
+        pages = self.walk(f'{RECIPES_URL}?cursor=&ordering=-favorites_count')
+        self.assertEqual(
+            [ids for _, ids in self.walk(pages[-1][0], link='previous')],
+            [ids for _, ids in reversed(pages)]
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f'{RECIPES_URL}?cursor=bad')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from favorited.models import Favorite, ShoppingCart
+from recipes.models import Ingredient, IngredientDetail, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeQueriesTest(APITestCase):
+    """
+    Число запросов к БД при чтении рецептов не зависит
+    от числа рецептов, тегов и ингредиентов на странице.
+    """
+    LIST_QUERIES = 5
+    LIST_AUTHENTICATED_QUERIES = 7
+    DETAIL_QUERIES = 4
+    DETAIL_AUTHENTICATED_QUERIES = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            ) for number in range(6)
+        ]
+        cls.authors = [
+            User.objects.create_user(
+                email=f'author{number}@example.com',
+                username=f'author{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='password'
+            ) for number in range(2)
+        ]
+        cls.user = User.objects.create_user(
+            email='reader@example.com',
+            username='reader',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.recipes = cls.create_recipes(5)
+        cls.user.subscriptions.add(cls.authors[0])
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    @classmethod
+    def create_recipes(cls, count):
+        start = Recipe.objects.count()
+        recipes = []
+        for number in range(start, start + count):
+            recipe = Recipe.objects.create(
+                author=cls.authors[number % len(cls.authors)],
+                name=f'Рецепт {number}',
+                text='Описание',
+                image='recipes/images/recipe.png',
+                cooking_time=10
+            )
+            recipe.tags.set(cls.tags[:number % len(cls.tags) + 1])
+            IngredientDetail.objects.bulk_create(
+                IngredientDetail(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                ) for ingredient in cls.ingredients[:number % 4 + 2]
+            )
+            recipes.append(recipe)
+        return recipes
+
+    def setUp(self):
+        cache.clear()
+
+    def authenticate(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list(self):
+        response = self.get(RECIPES_URL, self.LIST_QUERIES)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_list_authenticated(self):
+        self.authenticate()
+        self.get(RECIPES_URL, self.LIST_AUTHENTICATED_QUERIES)
+
+    def test_detail(self):
+        self.get(f'{RECIPES_URL}{self.recipes[0].id}/', self.DETAIL_QUERIES)
+
+    def test_detail_authenticated(self):
+        self.authenticate()
+        self.get(f'{RECIPES_URL}{self.recipes[0].id}/',
+                 self.DETAIL_AUTHENTICATED_QUERIES)
+
+    def test_list_does_not_grow_with_page(self):
+        self.create_recipes(10)
+        self.get(f'{RECIPES_URL}?limit=15', self.LIST_QUERIES)
+        cache.clear()
+        self.authenticate()
+        self.get(f'{RECIPES_URL}?limit=15', self.LIST_AUTHENTICATED_QUERIES)
@@ -0,0 +1,189 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import Ingredient, IngredientDetail, Recipe
+from rest_framework.test import APITestCase
+
+from api.search import RecipeSearchIndex, search_recipes
+
+User = get_user_model()
+
+RECIPES_URL = '/api/recipes/'
+
+RECIPES = (
+    ('Щи с капустой', 'Капуста, картофель и морковь.'),
+    ('Борщ', 'Свёкла, капуста и сметана.'),
+    ('Пирог с капустой', 'Тесто и капуста. Капуста тушёная.'),
+    ('Салат', 'Огурцы и помидоры.'),
+)
+
+
+def create_recipes(author):
+    return [
+        Recipe.objects.create(
+            author=author,
+            name=name,
+            text=text,
+            image='recipes/images/recipe.png',
+            cooking_time=10
+        ) for name, text in RECIPES
+    ]
+
+
+def create_author():
+    return User.objects.create_user(
+        email='author@example.com',
+        username='author',
+        first_name='Имя',
+        last_name='Фамилия',
+        password='password'
+    )
+
+
+class SearchRecipesTest(TestCase):
+    """
+    Поиск рецептов: все слова запроса, релевантность в search_rank.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soup, cls.borscht, cls.pie, cls.salad = create_recipes(
+            create_author()
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, value):
+        return list(search_recipes(Recipe.objects.all(), value).order_by(
+            '-search_rank', '-id'
+        ).values_list('pk', flat=True))
+
+    def test_word_forms(self):
+        self.assertEqual(
+            set(self.search('капуста')),
+            {self.soup.pk, self.borscht.pk, self.pie.pk}
+        )
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search('капуста сметана'), [self.borscht.pk])
+        self.assertEqual(self.search('капуста огурцы'), [])
+
+    def test_name_ranks_above_text(self):
+        self.assertEqual(
+            self.search('капуста'),
+            [self.pie.pk, self.soup.pk, self.borscht.pk]
+        )
+
+
+class RecipeSearchIndexTest(TestCase):
+    """
+    Индекс в памяти для баз без полнотекстового поиска.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soup, cls.borscht, cls.pie, cls.salad = create_recipes(
+            create_author()
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.index = RecipeSearchIndex()
+
+    def search(self, value, limit=10):
+        return [
+            (pk, round(score, 6))
+            for pk, score in self.index.search(value, limit)
+        ]
+
+    def test_scores(self):
+        self.assertEqual(self.search('капуста'), [
+            (self.pie.pk, 1.8),
+            (self.soup.pk, 1.4),
+            (self.borscht.pk, 0.4),
+        ])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(
+            self.search('свёкла капусты'), [(self.borscht.pk, 0.8)]
+        )
+        self.assertEqual(self.index.search('капуста огурцы', 10), [])
+
+    def test_short_words_and_limit(self):
+        self.assertEqual(self.index.search('и с', 10), [])
+        self.assertEqual(self.search('капуста', 1), [(self.pie.pk, 1.8)])
+
+    def test_rebuilt_after_invalidation(self):
+        self.index.search('капуста', 10)
+        Recipe.objects.filter(pk=self.salad.pk).update(
+            text='Огурцы и капуста.'
+        )
+        self.assertEqual(len(self.index.search('капуста', 10)), 3)
+        cache.clear()
+        self.assertEqual(len(self.index.search('капуста', 10)), 4)
+
+
+class RecipeSearchApiTest(APITestCase):
+    """
+    ?search и ?ingredients в списке рецептов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.soup, cls.borscht, cls.pie, cls.salad = create_recipes(
+            create_author()
+        )
+        cls.cabbage, cls.beet, cls.cucumber = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Капуста', 'Свёкла', 'Огурец')
+        )
+        for recipe, ingredients in (
+                (cls.soup, (cls.cabbage,)),
+                (cls.borscht, (cls.cabbage, cls.beet)),
+                (cls.pie, (cls.cabbage,)),
+                (cls.salad, (cls.cucumber,)),
+        ):
+            IngredientDetail.objects.bulk_create(
+                IngredientDetail(recipe=recipe, ingredient=ingredient,
+                                 amount=100)
+                for ingredient in ingredients
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_ids(self, params):
+        response = self.client.get(RECIPES_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']], response
+
+    def test_search_by_relevance(self):
+        ids, _ = self.get_ids({'search': 'капуста'})
+        self.assertEqual(ids, [self.pie.pk, self.soup.pk, self.borscht.pk])
+
+    def test_search_with_cursor_keeps_relevance(self):
+        ids, response = self.get_ids(
+            {'search': 'капуста', 'cursor': '', 'limit': 2}
+        )
+        self.assertEqual(ids, [self.pie.pk, self.soup.pk])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.borscht.pk]
+        )
+        self.assertIsNone(response.data['next'])
+
+    def test_ingredients_all_of(self):
+        ids, _ = self.get_ids(
+            {'ingredients': [self.cabbage.pk, self.beet.pk]}
+        )
+        self.assertEqual(ids, [self.borscht.pk])
+        ids, _ = self.get_ids({'ingredients': self.cabbage.pk})
+        self.assertEqual(
+            set(ids), {self.soup.pk, self.borscht.pk, self.pie.pk}
+        )
+
+    def test_ingredients_ignores_invalid_ids(self):
+        ids, _ = self.get_ids({'ingredients': [self.beet.pk, 'abc']})
+        self.assertEqual(ids, [self.borscht.pk])
@@ -0,0 +1,99 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from favorited import utils
+from favorited.models import ShoppingListItem
+from favorited.utils import rebuild_shopping_lists
+from recipes.models import Ingredient, IngredientDetail, Recipe
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+RECIPES_URL = '/api/recipes/'
+
+
+class ShoppingListTest(APITestCase):
+    """
+    Список покупок ShoppingListItem совпадает с суммами по корзине.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='buyer@example.com',
+            username='buyer',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.flour, cls.sugar = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Мука', 'Сахар')
+        )
+        cls.recipes = []
+        for number, amount in enumerate((100, 250)):
+            recipe = Recipe.objects.create(
+                author=cls.user,
+                name=f'Рецепт {number}',
+                text='Описание',
+                image='recipes/images/recipe.png',
+                cooking_time=10
+            )
+            IngredientDetail.objects.bulk_create(
+                IngredientDetail(
+                    recipe=recipe, ingredient=ingredient, amount=amount
+                ) for ingredient in (cls.flour, cls.sugar)
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def add_to_cart(self, recipe):
+        response = self.client.post(
+            f'{RECIPES_URL}{recipe.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def get_amounts(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.user
+        ).values_list('ingredient_id', 'amount'))
+
+    def test_interleaved_additions(self):
+        """
+        Второе добавление получает блокировку пользователя раньше
+        первого: первое должно пересчитать суммы уже после него.
+        """
+        first, second = self.recipes
+        lock_users = utils.lock_users
+        interleaved = []
+
+        def lock_after_other_request(user_ids):
+            if not interleaved:
+                interleaved.append(True)
+                self.add_to_cart(second)
+            lock_users(user_ids)
+
+        with mock.patch.object(utils, 'lock_users', lock_after_other_request):
+            self.add_to_cart(first)
+        self.assertTrue(interleaved)
+        self.assertEqual(
+            self.get_amounts(), {self.flour.id: 350, self.sugar.id: 350}
+        )
+        self.assertEqual(rebuild_shopping_lists(check=True), {})
+
+    def test_remove_from_cart(self):
+        first, second = self.recipes
+        self.add_to_cart(first)
+        self.add_to_cart(second)
+        response = self.client.delete(
+            f'{RECIPES_URL}{first.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            self.get_amounts(), {self.flour.id: 250, self.sugar.id: 250}
+        )
+        self.assertEqual(rebuild_shopping_lists(check=True), {})
@@ -1,5 +1,10 @@
+from api.asynchronous import async_read
+from api.metrics.views import CacheStatsView, PrometheusMetricsView
+from api.recipes import async_views as recipes_async
 from api.recipes.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from api.users import async_views as users_async
 from api.users.views import CustomUserViewSet
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
@@ -21,5 +26,38 @@ router_v1.register('users', CustomUserViewSet)
 
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
+    path('cache/stats/', CacheStatsView.as_view()),
+    path('metrics/', PrometheusMetricsView.as_view()),
+]
+
+if settings.ASYNC_READ_API:
+    # Те же адреса, что у роутера: чтение обрабатывают корутины,
+    # остальное — представления роутера.
+    router_views = {
+        pattern.name: pattern.callback for pattern in router_v1.urls
+    }
+    urlpatterns += [
+        path('tags/', async_read(
+            recipes_async.tags_list, router_views['tag-list']
+        )),
+        path('tags/<int:pk>/', async_read(
+            recipes_async.tag_detail, router_views['tag-detail']
+        )),
+        path('ingredients/', async_read(
+            recipes_async.ingredients_list, router_views['ingredient-list']
+        )),
+        path('recipes/', async_read(
+            recipes_async.recipes_list, router_views['recipe-list']
+        )),
+        path('recipes/<int:pk>/', async_read(
+            recipes_async.recipe_detail, router_views['recipe-detail']
+        )),
+        path('users/subscriptions/', async_read(
+            users_async.subscriptions,
+            router_views['customuser-subscriptions']
+        )),
+    ]
+
+urlpatterns += [
     path('', include(router_v1.urls))
 ]
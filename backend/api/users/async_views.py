@@ -0,0 +1,44 @@
+import asyncio
+
+from api.asynchronous import Page, accepts, alist
+from api.subscriptions.serializers import SubscriptionSerializer
+from asgiref.sync import sync_to_async
+from django.db.models import Count
+from rest_framework import exceptions
+
+from .views import get_recipes_by_author
+
+
+def serialize_subscriptions(request, authors):
+    # Рецепты читаются из БД, а картинки проверяются в хранилище,
+    # поэтому сериализация идёт в потоке.
+    return SubscriptionSerializer(
+        authors,
+        context={
+            'request': request,
+            'recipes_by_author': get_recipes_by_author(
+                authors, request.GET.get('recipes_limit')
+            )
+        },
+        many=True
+    ).data
+
+
+@accepts('page', 'limit', 'recipes_limit')
+async def subscriptions(request):
+    """
+    Число подписок и авторы страницы запрашиваются одновременно.
+    """
+    if not request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    page = Page(request)
+    authors = request.user.subscriptions.annotate(
+        recipes_count=Count('recipe')
+    ).order_by('id')
+    count, authors = await asyncio.gather(
+        authors.acount(), alist(page.slice(authors))
+    )
+    page.check(count)
+    return page.data(
+        count, await sync_to_async(serialize_subscriptions)(request, authors)
+    )
@@ -20,6 +20,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         return (user.is_authenticated
                 and user.subscriptions.filter(email=obj.email).exists())
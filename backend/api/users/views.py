@@ -1,30 +1,62 @@
-from api.pagination import CustomPagination
 from api.subscriptions.serializers import SubscriptionSerializer
 from api.users.serializers import CustomUserSerializer
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
 from djoser.views import UserViewSet
+from recipes.models import Recipe
 from rest_framework import permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 
+def get_recipes_by_author(authors, recipes_limit=None):
+    """
+    Рецепты авторов страницы одним запросом: не больше
+    recipes_limit самых новых на автора (ROW_NUMBER по автору).
+    """
+    recipes = Recipe.objects.defer('search_vector').filter(
+        author__in=authors
+    )
+    if recipes_limit and recipes_limit.isdigit():
+        recipes = recipes.annotate(row_number=Window(
+            RowNumber(),
+            partition_by=F('author'),
+            order_by=F('id').desc()
+        )).filter(row_number__lte=int(recipes_limit))
+    recipes_by_author = {author.id: [] for author in authors}
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    return recipes_by_author
+
+
 class CustomUserViewSet(UserViewSet):
     serializer_class = CustomUserSerializer
+    ordering = ('id',)
+
+    def get_recipes_by_author(self, authors):
+        return get_recipes_by_author(
+            authors, self.request.query_params.get('recipes_limit')
+        )
 
-    @action(detail=False, methods=['GET'])
+    @action(detail=False, methods=['GET'],
+            permission_classes=[permissions.IsAuthenticated])
     def subscriptions(self, request):
-        subscriptions = request.user.subscriptions.all()
-        all_data = SubscriptionSerializer(
-            subscriptions,
+        subscriptions = request.user.subscriptions.annotate(
+            recipes_count=Count('recipe')
+        ).order_by('id')
+        page = self.paginate_queryset(subscriptions)
+        authors = subscriptions if page is None else page
+        serializer = SubscriptionSerializer(
+            authors,
             context={
-                'request': request
+                'request': request,
+                'recipes_by_author': self.get_recipes_by_author(authors)
             },
             many=True
-        ).data
-        paginator = CustomPagination()
-        page = paginator.paginate_queryset(all_data, request)
+        )
         if page is not None:
-            return paginator.get_paginated_response(page)
-        return Response(all_data, status=status.HTTP_200_OK)
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'],
             permission_classes=[permissions.IsAuthenticated])
@@ -2,3 +2,69 @@ USER_NAMES_MAX_LENGTH = 150
 USER_EMAIL_MAX_LENGTH = 254
 MAX_NAME_LENGTH = 200
 MAX_MEASUREMENT_UNIT_LENGTH = 32
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SEARCH_SIMILARITY = 0.3
+RECIPE_SEARCH_CONFIG = 'russian'
+# Только для индекса в памяти: больше результатов не ранжируется.
+RECIPE_SEARCH_LIMIT = 1000
+# Вес слова в названии и в описании, как A и B у ts_rank.
+RECIPE_SEARCH_WEIGHTS = (1.0, 0.4)
+# Окончания, которые отбрасывает поиск без Postgres, длинные первыми.
+RECIPE_SEARCH_ENDINGS = (
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ую', 'юю',
+    'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ов', 'ев', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь',
+    'es', 's',
+)
+RESPONSE_CACHE_LOCAL_SIZE = 256
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+RECIPE_FLAGS_CACHE_TIMEOUT = 60
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
+AUTH_TOKEN_LOCAL_TIMEOUT = 10
+AUTH_TOKEN_LOCAL_SIZE = 1024
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_DECODE_CHUNK_SIZE = 64 * 1024
+IMAGE_MAX_SIDE = 2048
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'WEBP': 'webp',
+    'GIF': 'gif',
+}
+IMAGE_VARIANTS = {
+    'card': 480,
+    'detail': 960,
+    'retina': 1920,
+}
+BULK_RECIPES_MAX = 100
+PANTRY_INGREDIENTS_MAX = 100
+# Сколько поколений изменений индекс дочитывает, прежде чем
+# пересобраться целиком, и сколько они хранятся в кэше.
+PANTRY_CHANGES_MAX = 1000
+PANTRY_CHANGES_TIMEOUT = 60 * 60
+SIMILAR_RECIPES_COUNT = 10
+# Ингредиенты и теги, которые есть в большей доле рецептов,
+# не влияют на сходство.
+SIMILAR_RECIPES_MAX_SHARE = 0.5
+# Кандидаты в соседи ищутся только по ингредиентам не больше
+# чем из стольких рецептов.
+SIMILAR_RECIPES_MAX_POSTINGS = 500
+SIMILAR_RECIPES_BATCH_SIZE = 1000
+METRICS_DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+METRICS_QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+# Запросы к БД на один вызов, включая проверку токена.
+QUERY_BUDGETS = {
+    'RecipeViewSet.list': 10,
+    'RecipeViewSet.retrieve': 8,
+    'RecipeViewSet.pantry': 4,
+    'RecipeViewSet.similar': 3,
+    'TagViewSet.list': 2,
+    'IngredientViewSet.list': 2,
+    'CustomUserViewSet.list': 4,
+    'CustomUserViewSet.subscriptions': 6,
+    'CustomUserViewSet.me': 3,
+}
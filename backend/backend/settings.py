@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -15,6 +16,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -27,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -36,6 +39,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+TESTING = sys.argv[1:2] == ['test']
+
+# off, warn или raise: см. QUERY_BUDGETS в constants.
+# В manage.py test по умолчанию raise, превышение бюджета роняет тест.
+QUERY_BUDGET_MODE = os.getenv(
+    'QUERY_BUDGET_MODE', 'raise' if TESTING else 'warn'
+)
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split()
+# Асинхронные представления для чтения каталога, рецептов и подписок,
+# только вместе с ASGI (backend.asgi), см. api/urls.py.
+ASYNC_READ_API = os.getenv('ASYNC_READ_API', False) == 'True'
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -67,6 +82,44 @@ DATABASES = {
     }
 }
 
+# Соединения с БД.
+# persistent: соединение живёт DB_CONN_MAX_AGE секунд и переиспользуется,
+#   на каждый поток gunicorn своё (размер пула = воркеры * потоки);
+# pgbouncer: то же, но через PgBouncer в режиме transaction,
+#   поэтому без серверных курсоров;
+# none: новое соединение на каждый запрос.
+# Под ASGI у каждого запроса свой поток, постоянные соединения
+# копились бы по одному на запрос, поэтому с ASYNC_READ_API они
+# выключены: пул держит PgBouncer.
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'persistent')
+DATABASES['default'].update({
+    'CONN_MAX_AGE': (
+        0 if DB_POOL_MODE == 'none' or ASYNC_READ_API
+        else int(os.getenv('DB_CONN_MAX_AGE', 60))
+    ),
+    'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+    'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'pgbouncer',
+})
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+    }
+    DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))
+    if DB_STATEMENT_TIMEOUT:
+        DATABASES['default']['OPTIONS']['options'] = (
+            f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'
+        )
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 AUTH_USER_MODEL = 'users.CustomUser'
 DJOSER = {
     'HIDE_USERS': False,
@@ -103,7 +156,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPagination',
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
@@ -122,6 +175,10 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media/'
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+SIMILAR_RECIPES_REFRESH = (
+    os.getenv('SIMILAR_RECIPES_REFRESH', 'True') == 'True'
+)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from favorited.utils import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает списки покупок пользователей '
+            'и проверяет их на расхождения с корзинами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить, ничего не изменяя.'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = rebuild_shopping_lists(check=options['check'])
+        for (user_id, ingredient_id), (stored, expected) in sorted(
+                mismatches.items()
+        ):
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'сохранено {stored}, должно быть {expected}'
+            )
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+        elif options['check']:
+            raise CommandError(f'Найдено расхождений: {len(mismatches)}.')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено расхождений: {len(mismatches)}.'
+            ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from favorited.utils import reconcile_recipe_counters
+
+
+class Command(BaseCommand):
+    help = ('Сверяет счётчики избранного и списков покупок '
+            'у рецептов и исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить, ничего не изменяя.'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = reconcile_recipe_counters(check=options['check'])
+        for (recipe_id, field), (stored, expected) in sorted(
+                mismatches.items()
+        ):
+            self.stdout.write(
+                f'recipe={recipe_id} {field}: '
+                f'сохранено {stored}, должно быть {expected}'
+            )
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+        elif options['check']:
+            raise CommandError(f'Найдено расхождений: {len(mismatches)}.')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено расхождений: {len(mismatches)}.'
+            ))
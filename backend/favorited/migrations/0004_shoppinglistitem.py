@@ -0,0 +1,54 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    IngredientDetail = apps.get_model('recipes', 'IngredientDetail')
+    ShoppingListItem = apps.get_model('favorited', 'ShoppingListItem')
+    totals = IngredientDetail.objects.filter(
+        ingredient__isnull=False,
+        recipe__shoppingcart__isnull=False
+    ).values(
+        'recipe__shoppingcart__user_id', 'ingredient_id'
+    ).annotate(total_amount=Sum('amount')).order_by()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=total['recipe__shoppingcart__user_id'],
+            ingredient_id=total['ingredient_id'],
+            amount=total['total_amount']
+        ) for total in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favorited', '0003_initial'),
+        ('recipes', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Позиции списка покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:09
+
+from django.db import migrations
+from django.db.models import Min, Sum
+
+
+def remove_duplicates(apps, schema_editor):
+    removed = 0
+    for model_name in ('Favorite', 'ShoppingCart'):
+        model = apps.get_model('favorited', model_name)
+        keep = model.objects.values('user', 'recipe').annotate(
+            first_id=Min('id')
+        ).values('first_id')
+        removed += model.objects.exclude(id__in=keep).delete()[0]
+    if not removed:
+        return
+    # Дубли в корзине попадали в суммы списка покупок дважды.
+    IngredientDetail = apps.get_model('recipes', 'IngredientDetail')
+    ShoppingListItem = apps.get_model('favorited', 'ShoppingListItem')
+    ShoppingListItem.objects.all().delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=total['recipe__shoppingcart__user_id'],
+            ingredient_id=total['ingredient_id'],
+            amount=total['total_amount']
+        ) for total in IngredientDetail.objects.filter(
+            ingredient__isnull=False,
+            recipe__shoppingcart__isnull=False
+        ).values(
+            'recipe__shoppingcart__user_id', 'ingredient_id'
+        ).annotate(total_amount=Sum('amount')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favorited', '0004_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,219 @@
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from recipes.models import IngredientDetail, Recipe, User
+
+from .models import Favorite, ShoppingCart, ShoppingListItem
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+def get_shopping_list_totals(user_ids=None, ingredient_ids=None):
+    """
+    Суммы ингредиентов по спискам покупок, посчитанные по рецептам
+    из корзины: {(user_id, ingredient_id): amount}.
+    """
+    filters = {
+        'ingredient__isnull': False,
+        'recipe__shoppingcart__isnull': False
+    }
+    if user_ids is not None:
+        filters['recipe__shoppingcart__user_id__in'] = user_ids
+    if ingredient_ids is not None:
+        filters['ingredient_id__in'] = ingredient_ids
+    totals = IngredientDetail.objects.filter(**filters).values(
+        'recipe__shoppingcart__user_id',
+        'ingredient_id'
+    ).annotate(
+        total_amount=Sum('amount')
+    ).order_by().values_list(
+        'recipe__shoppingcart__user_id',
+        'ingredient_id',
+        'total_amount'
+    )
+    return {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount in totals
+    }
+
+
+def lock_users(user_ids):
+    """
+    Блокирует строки пользователей до конца транзакции: списки
+    покупок одного пользователя пересчитываются по очереди.
+    Порядок по pk, чтобы параллельные пересчёты не ждали друг друга
+    по кругу.
+    """
+    list(User.objects.select_for_update().filter(
+        pk__in=user_ids
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def refresh_shopping_lists(user_ids, ingredient_ids):
+    """
+    Пересчитывает только затронутые строки ShoppingListItem:
+    указанные ингредиенты у указанных пользователей.
+    Суммы считаются под блокировкой пользователей, иначе параллельное
+    изменение корзины перезаписалось бы устаревшими суммами.
+    """
+    user_ids = list(user_ids)
+    ingredient_ids = [
+        ingredient_id for ingredient_id in ingredient_ids
+        if ingredient_id is not None
+    ]
+    if not user_ids or not ingredient_ids:
+        return
+    with transaction.atomic():
+        lock_users(user_ids)
+        totals = get_shopping_list_totals(user_ids, ingredient_ids)
+        current = ShoppingListItem.objects.filter(
+            user_id__in=user_ids,
+            ingredient_id__in=ingredient_ids
+        ).values_list('pk', 'user_id', 'ingredient_id')
+        ShoppingListItem.objects.filter(pk__in=[
+            pk for pk, user_id, ingredient_id in current
+            if (user_id, ingredient_id) not in totals
+        ]).delete()
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                ) for (user_id, ingredient_id), amount in totals.items()
+            ),
+            update_conflicts=True,
+            unique_fields=('user', 'ingredient'),
+            update_fields=('amount',)
+        )
+
+
+def refresh_recipe_in_shopping_list(user_id, recipe_id):
+    """
+    Обновляет список покупок после добавления рецепта в корзину
+    или удаления из неё.
+    """
+    refresh_recipes_in_shopping_list(user_id, [recipe_id])
+
+
+def refresh_recipes_in_shopping_list(user_id, recipe_ids):
+    refresh_shopping_lists(
+        [user_id],
+        IngredientDetail.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('ingredient_id', flat=True).distinct()
+    )
+
+
+def rebuild_shopping_lists(check=False):
+    """
+    Пересобирает ShoppingListItem с нуля.
+    Возвращает расхождения, найденные до пересборки:
+    {(user_id, ingredient_id): (сохранено, должно быть)}.
+    С check=True таблица не изменяется.
+    """
+    with transaction.atomic():
+        totals = get_shopping_list_totals()
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in ShoppingListItem.objects.select_for_update().values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+        mismatches = {
+            key: (stored.get(key), totals.get(key))
+            for key in stored.keys() | totals.keys()
+            if stored.get(key) != totals.get(key)
+        }
+        if mismatches and not check:
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                ) for (user_id, ingredient_id), amount in totals.items()
+            )
+    return mismatches
+
+
+def change_recipe_counter(model, recipe_ids, delta):
+    """
+    Атомарно меняет счётчик рецептов для Favorite или ShoppingCart
+    одним UPDATE ... SET count = count + delta.
+    """
+    field = RECIPE_COUNTERS[model]
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        **{field: F(field) + delta}
+    )
+
+
+def insert_user_recipes(model, user_id, recipe_ids):
+    """
+    Добавляет рецепты пользователю в Favorite или ShoppingCart
+    одним INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    Возвращает id рецептов, которые действительно вставлены:
+    bulk_create с ignore_conflicts этого не сообщает.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return []
+    quote = connection.ops.quote_name
+    opts = model._meta
+    columns = ', '.join(
+        quote(opts.get_field(name).column) for name in ('user', 'recipe')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(opts.db_table)} ({columns}) '
+            f'VALUES {", ".join(["(%s, %s)"] * len(recipe_ids))} '
+            f'ON CONFLICT DO NOTHING '
+            f'RETURNING {quote(opts.get_field("recipe").column)}',
+            [value for recipe_id in recipe_ids
+             for value in (user_id, recipe_id)]
+        )
+        return [recipe_id for recipe_id, in cursor.fetchall()]
+
+
+def count_subquery(model):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            recipe=OuterRef('pk')
+        ).values('recipe').annotate(count=Count('*')).values('count')
+    ), 0)
+
+
+def reconcile_recipe_counters(check=False):
+    """
+    Сверяет счётчики рецептов с Favorite и ShoppingCart
+    и исправляет расхождения.
+    Возвращает {(recipe_id, поле): (сохранено, должно быть)}.
+    """
+    expected = {
+        field: count_subquery(model)
+        for model, field in RECIPE_COUNTERS.items()
+    }
+    drifted = Q()
+    for field in expected:
+        drifted |= ~Q(**{field: F(f'expected_{field}')})
+    drifted = Recipe.objects.annotate(**{
+        f'expected_{field}': value for field, value in expected.items()
+    }).filter(drifted).values(
+        'pk', *expected, *(f'expected_{field}' for field in expected)
+    )
+    mismatches = {}
+    for row in drifted:
+        for field in expected:
+            if row[field] != row[f'expected_{field}']:
+                mismatches[row['pk'], field] = (
+                    row[field], row[f'expected_{field}']
+                )
+    if mismatches and not check:
+        Recipe.objects.filter(
+            pk__in={recipe_id for recipe_id, _ in mismatches}
+        ).update(**expected)
+    return mismatches
@@ -0,0 +1,11 @@
+import os
+
+# Приложение по умолчанию — WSGI. Для асинхронного чтения
+# (ASYNC_READ_API=True): GUNICORN_APP=backend.asgi
+# и GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker.
+wsgi_app = os.getenv('GUNICORN_APP', 'backend.wsgi')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+# Каждый поток держит своё соединение с БД (CONN_MAX_AGE),
+# поэтому воркеры * потоки — это и размер пула соединений.
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
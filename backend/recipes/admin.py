@@ -1,6 +1,5 @@
 from django import forms
 from django.contrib import admin
-from favorited.models import Favorite
 
 from .models import Ingredient, Recipe, Tag
 
@@ -25,18 +24,14 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name',
         'author',
-        'added_in_favorite'
+        'favorites_count',
+        'in_carts_count'
     )
     list_filter = ('author', 'name', 'tags')
     list_display_links = ('name', 'author',)
     inlines = (IngredientsInlineAdmin,)
     filter_horizontal = ('tags',)
-
-    def added_in_favorite(self, obj):
-        count = Favorite.objects.filter(recipe=obj).count()
-        return count
-
-    added_in_favorite.short_description = 'В избранном'
+    readonly_fields = ('favorites_count', 'in_carts_count')
 
 
 class IngredientAdmin(admin.ModelAdmin):
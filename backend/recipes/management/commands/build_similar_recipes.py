@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from recipes.utils import build_similar_recipes
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает таблицу похожих рецептов '
+            'по общим ингредиентам и тегам.')
+
+    def handle(self, *args, **options):
+        count = build_similar_recipes()
+        self.stdout.write(self.style.SUCCESS(
+            f'Соседи посчитаны для рецептов: {count}.'
+        ))
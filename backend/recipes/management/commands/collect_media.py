@@ -0,0 +1,54 @@
+import os
+import time
+
+from api.images import get_image_file_names
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+
+MIN_AGE = 60 * 60
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из MEDIA_ROOT изображения и их варианты, '
+            'на которые не ссылается ни один рецепт.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            default=MIN_AGE,
+            type=int,
+            help=('Не трогать файлы моложе указанного числа секунд: '
+                  'рецепт с ними может ещё сохраняться.')
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+
+    def handle(self, *args, **options):
+        referenced = set()
+        for name in Recipe.objects.values_list(
+                'image', flat=True
+        ).distinct().iterator():
+            referenced.update(get_image_file_names(name))
+        deadline = time.time() - options['min_age']
+        removed = freed = 0
+        with os.scandir(settings.MEDIA_ROOT) as entries:
+            for entry in entries:
+                if (not entry.is_file() or entry.name in referenced
+                        or entry.stat().st_mtime > deadline):
+                    continue
+                size = entry.stat().st_size
+                if options['dry_run']:
+                    self.stdout.write(entry.name)
+                else:
+                    os.remove(entry.path)
+                removed += 1
+                freed += size
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов без ссылок: {removed}, '
+            f'{freed / (1024 * 1024):.1f} МБ'
+            + (' (ничего не удалено)' if options['dry_run'] else '')
+        ))
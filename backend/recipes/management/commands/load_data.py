@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+from itertools import islice
+from pathlib import Path
+
+from api.cache import (ingredient_response_cache, recipe_response_cache,
+                       tag_response_cache)
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+from recipes.models import Ingredient, Tag
+
+DEFAULT_FILES = (
+    'ingredients.csv',
+    'recipes_ingredient.csv',
+    'recipes_tag.csv',
+)
+BATCH_SIZE = 1000
+
+
+def read_ingredients(path):
+    if path.suffix == '.json':
+        with open(path, encoding='utf-8') as file:
+            for item in json.load(file):
+                yield item['name'], item['measurement_unit']
+        return
+    with open(path, encoding='utf-8') as file:
+        for row in csv.reader(file):
+            # Файлы бывают как с колонкой id, так и без неё.
+            yield tuple(row[-2:])
+
+
+def read_tags(path):
+    with open(path, encoding='utf-8') as file:
+        for row in csv.reader(file):
+            yield tuple(row[-3:])
+
+
+# Модель, поля в порядке файла, поле для ON CONFLICT, чтение файла.
+# Теги сопоставляются по slug: по нему их ищут фильтры,
+# а название можно поменять.
+LOADERS = {
+    'ingredient': (
+        Ingredient, ('name', 'measurement_unit'), 'name', read_ingredients
+    ),
+    'tag': (Tag, ('name', 'color', 'slug'), 'slug', read_tags),
+}
+
+
+def get_loader(path):
+    if 'tag' in path.stem:
+        return LOADERS['tag']
+    if 'ingredient' in path.stem:
+        return LOADERS['ingredient']
+    raise CommandError(f'Неизвестный тип данных в файле {path.name}')
+
+
+def batches(rows, size, key):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        # В одной пачке ключ должен встречаться один раз,
+        # иначе ON CONFLICT DO UPDATE упадёт.
+        yield list({row[key]: row for row in batch}.values())
+
+
+class Command(BaseCommand):
+    help = ('Загружает ингредиенты и теги из файлов data/ '
+            'с обновлением уже существующих записей: ингредиентов '
+            'по name, тегов по slug.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='*',
+            default=DEFAULT_FILES,
+            help='Файлы для загрузки (csv или json).'
+        )
+        parser.add_argument(
+            '--path',
+            default=settings.BASE_DIR.parent / 'data',
+            type=Path,
+            help='Каталог с файлами.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            default=BATCH_SIZE,
+            type=int
+        )
+
+    def handle(self, *args, **options):
+        for name in options['files']:
+            path = options['path'] / name
+            if not path.exists():
+                raise CommandError(f'Файл {path} не найден')
+            model, fields, key, reader = get_loader(path)
+            loaded = 0
+            for batch in batches(reader(path), options['batch_size'],
+                                 fields.index(key)):
+                try:
+                    self.upsert(model, fields, key, batch)
+                except IntegrityError as error:
+                    # Например, новый slug у тега с уже занятым названием.
+                    raise CommandError(f'{path.name}: {error}')
+                loaded += len(batch)
+                self.stdout.write(f'{path.name}: {loaded}')
+            self.stdout.write(self.style.SUCCESS(
+                f'{path.name}: загружено {loaded} записей '
+                f'в {model._meta.verbose_name_plural}'
+            ))
+        # bulk_create и COPY не отправляют post_save.
+        tag_response_cache.invalidate()
+        ingredient_response_cache.invalidate()
+        recipe_response_cache.invalidate()
+
+    def upsert(self, model, fields, key, rows):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if (connection.vendor == 'postgresql'
+                        and hasattr(cursor, 'copy_expert')):
+                    return self.copy_upsert(cursor, model, fields, key, rows)
+            model.objects.bulk_create(
+                (model(**dict(zip(fields, row))) for row in rows),
+                update_conflicts=True,
+                unique_fields=(key,),
+                update_fields=[field for field in fields if field != key]
+            )
+
+    def copy_upsert(self, cursor, model, fields, key, rows):
+        """
+        COPY во временную таблицу и один INSERT ... ON CONFLICT из неё.
+        """
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        columns = ', '.join(quote(field) for field in fields)
+        cursor.execute(
+            f'CREATE TEMP TABLE load_data ON COMMIT DROP AS '
+            f'SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f'COPY load_data ({columns}) FROM STDIN WITH CSV', buffer
+        )
+        updates = ', '.join(
+            f'{quote(field)} = EXCLUDED.{quote(field)}'
+            for field in fields if field != key
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT {columns} FROM load_data '
+            f'ON CONFLICT ({quote(key)}) DO UPDATE SET {updates}'
+        )
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:08
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def make_slugs_unique(apps, schema_editor):
+    Tag = apps.get_model('recipes', 'Tag')
+    duplicates = Tag.objects.values('slug').annotate(
+        total=Count('id')
+    ).filter(total__gt=1).values_list('slug', flat=True)
+    for tag in Tag.objects.filter(slug__in=list(duplicates)).order_by('id'):
+        if Tag.objects.filter(slug=tag.slug, id__lt=tag.id).exists():
+            tag.slug = f'{tag.slug}-{tag.id}'
+            tag.save(update_fields=('slug',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_image_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_slugs_unique, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tag',
+            name='slug',
+            field=models.SlugField(unique=True, verbose_name='Слаг'),
+        ),
+        # Обратный к уникальному (recipe_id, tag_id) индекс для
+        # фильтрации по тегам, когда выборку ведёт тег.
+        migrations.RunSQL(
+            'CREATE INDEX recipes_recipe_tags_tag_recipe_idx '
+            'ON recipes_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX recipes_recipe_tags_tag_recipe_idx'
+        ),
+    ]
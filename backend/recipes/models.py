@@ -1,5 +1,6 @@
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -19,6 +20,7 @@ class Tag(models.Model):
         verbose_name='Цвет'
     )
     slug = models.SlugField(
+        unique=True,
         verbose_name='Слаг'
     )
 
@@ -83,6 +85,7 @@ class Recipe(models.Model):
         verbose_name='Название',
     )
     image = models.ImageField(
+        db_index=True,
         verbose_name='Фотография'
     )
     text = models.TextField(
@@ -106,12 +109,78 @@ class Recipe(models.Model):
         ),
         verbose_name='Время приготовления'
     )
+    # Счётчики поддерживаются в favorited,
+    # расхождения исправляет reconcile_recipe_counters.
+    # editable=False: сериализаторы и формы не принимают их от клиента.
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    # Заполняется триггером Postgres из name и text (миграция 0007),
+    # на других БД остаётся пустым, см. api.search.search_recipes.
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-id',)
         unique_together = ('name', 'author', 'text')
+        indexes = (
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_popularity_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
+
+
+class SimilarRecipe(models.Model):
+    """
+    Ближайшие соседи рецепта по общим ингредиентам и тегам.
+
+    Денормализованная таблица: строится командой
+    build_similar_recipes и обновляется в recipes.utils.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'),
+                name='similar_recipe_score_idx'
+            ),
+        )
@@ -0,0 +1,325 @@
+"""
+Таблица похожих рецептов SimilarRecipe.
+
+Рецепт — разреженный вектор признаков: id ингредиентов и -id тегов
+с весом idf = log(N / df), где N — число рецептов, df — число
+рецептов с признаком. Сходство — косинус между векторами.
+
+Кандидаты в соседи — рецепты с общим редким ингредиентом
+(df не больше SIMILAR_RECIPES_MAX_POSTINGS): их находят по спискам
+рецептов этих ингредиентов. Теги и частые ингредиенты входят
+в сходство, но кандидатов не добавляют, поэтому работа на рецепт
+не растёт с размером таблицы.
+"""
+import heapq
+import logging
+import math
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+
+from backend.constants import (SIMILAR_RECIPES_BATCH_SIZE,
+                               SIMILAR_RECIPES_COUNT,
+                               SIMILAR_RECIPES_MAX_POSTINGS,
+                               SIMILAR_RECIPES_MAX_SHARE)
+
+from .models import IngredientDetail, Recipe, SimilarRecipe
+
+logger = logging.getLogger(__name__)
+
+RecipeTag = Recipe.tags.through
+
+
+def get_feature_sources(features=None):
+    """
+    (queryset, поле, знак признака) для ингредиентов и тегов,
+    с features — только строки этих признаков.
+    """
+    ingredients = IngredientDetail.objects.filter(ingredient__isnull=False)
+    tags = RecipeTag.objects.all()
+    if features is not None:
+        ingredients = ingredients.filter(ingredient_id__in=[
+            feature for feature in features if feature > 0
+        ])
+        tags = tags.filter(tag_id__in=[
+            -feature for feature in features if feature < 0
+        ])
+    return (ingredients, 'ingredient_id', 1), (tags, 'tag_id', -1)
+
+
+def load_features(recipe_ids=None):
+    """
+    {id рецепта: множество признаков}, без recipe_ids — все рецепты.
+    recipe_ids может быть подзапросом.
+    """
+    features = defaultdict(set)
+    for queryset, field, sign in get_feature_sources():
+        if recipe_ids is not None:
+            queryset = queryset.filter(recipe_id__in=recipe_ids)
+        for recipe_id, feature in queryset.values_list(
+                'recipe_id', field
+        ).iterator():
+            features[recipe_id].add(feature * sign)
+    return features
+
+
+def count_recipes(features):
+    """
+    df признаков features по всей таблице.
+    """
+    frequencies = Counter()
+    for queryset, field, sign in get_feature_sources(features):
+        frequencies.update({
+            feature * sign: count
+            for feature, count in queryset.values(field).annotate(
+                count=Count('*')
+            ).values_list(field, 'count')
+        })
+    return frequencies
+
+
+def get_weights(frequencies, total):
+    """
+    idf признаков. Слишком частые признаки
+    (больше SIMILAR_RECIPES_MAX_SHARE рецептов) не учитываются.
+    """
+    return {
+        feature: math.log(total / frequency)
+        for feature, frequency in frequencies.items()
+        if frequency <= total * SIMILAR_RECIPES_MAX_SHARE
+    }
+
+
+def get_candidate_features(frequencies, weights):
+    """
+    Ингредиенты, по которым ищутся кандидаты в соседи.
+    """
+    return {
+        feature for feature, frequency in frequencies.items()
+        if feature > 0 and feature in weights
+        and frequency <= SIMILAR_RECIPES_MAX_POSTINGS
+    }
+
+
+class Vectors:
+    """
+    Векторы рецептов features с весами weights. Списки рецептов
+    строятся только для признаков candidate_features.
+    """
+
+    def __init__(self, features, weights, candidate_features):
+        self.features = features
+        self.weights = weights
+        self.candidate_features = candidate_features
+        self.postings = defaultdict(list)
+        self.norms = {}
+        for recipe_id, recipe_features in features.items():
+            norm = math.sqrt(sum(
+                weights[feature] ** 2
+                for feature in recipe_features if feature in weights
+            ))
+            if not norm:
+                continue
+            self.norms[recipe_id] = norm
+            for feature in recipe_features & candidate_features:
+                self.postings[feature].append(recipe_id)
+
+    def get_scores(self, recipe_id):
+        """
+        {id рецепта: косинус} для кандидатов в соседи recipe_id.
+        """
+        features = self.features[recipe_id]
+        if recipe_id not in self.norms:
+            return {}
+        products = defaultdict(float)
+        for feature in features & self.candidate_features:
+            square = self.weights[feature] ** 2
+            for other_id in self.postings[feature]:
+                products[other_id] += square
+        products.pop(recipe_id, None)
+        rest = [
+            (feature, self.weights[feature] ** 2) for feature in features
+            if feature in self.weights
+            and feature not in self.candidate_features
+        ]
+        norm = self.norms[recipe_id]
+        scores = {}
+        for other_id, product in products.items():
+            other_features = self.features[other_id]
+            product += sum(
+                square for feature, square in rest
+                if feature in other_features
+            )
+            scores[other_id] = product / (norm * self.norms[other_id])
+        return scores
+
+
+def get_neighbors(scores):
+    """
+    SIMILAR_RECIPES_COUNT ближайших: [(id рецепта, сходство)].
+    """
+    return heapq.nlargest(
+        SIMILAR_RECIPES_COUNT, scores.items(),
+        key=lambda item: (item[1], item[0])
+    )
+
+
+def create_rows(neighbors):
+    """
+    Записывает строки SimilarRecipe пачками
+    из пар (id рецепта, [(id похожего, сходство)]).
+    """
+    rows = (
+        SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                      score=score)
+        for recipe_id, similar in neighbors
+        for similar_id, score in similar
+    )
+    while batch := list(islice(rows, SIMILAR_RECIPES_BATCH_SIZE)):
+        SimilarRecipe.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=('recipe', 'similar'),
+            update_fields=('score',)
+        )
+
+
+def build_similar_recipes():
+    """
+    Пересобирает SimilarRecipe с нуля. Возвращает число рецептов.
+    """
+    features = load_features()
+    frequencies = Counter()
+    for recipe_features in features.values():
+        frequencies.update(recipe_features)
+    weights = get_weights(frequencies, Recipe.objects.count())
+    vectors = Vectors(
+        features, weights, get_candidate_features(frequencies, weights)
+    )
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        create_rows(
+            (recipe_id, get_neighbors(vectors.get_scores(recipe_id)))
+            for recipe_id in features
+        )
+    return len(features)
+
+
+def refresh_similar_recipes(recipe_ids):
+    """
+    Обновляет соседей после изменения или удаления рецептов recipe_ids.
+
+    Заново считаются списки самих рецептов и тех, у кого они
+    были в соседях. В списки их кандидатов вносится новое сходство
+    с ними. Веса берутся по всей таблице, но сходство других пар
+    не пересчитывается до следующей сборки build_similar_recipes.
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    recipe_ids.update(SimilarRecipe.objects.filter(
+        similar_id__in=recipe_ids
+    ).values_list('recipe_id', flat=True))
+    features = load_features(recipe_ids)
+    total = Recipe.objects.count()
+    frequencies = count_recipes(set().union(*features.values()))
+    candidate_features = get_candidate_features(
+        frequencies, get_weights(frequencies, total)
+    )
+    # Кандидаты выбираются подзапросом, без списка id в запросе.
+    candidates = IngredientDetail.objects.filter(
+        ingredient_id__in=candidate_features
+    ).values('recipe_id')
+    features.update(
+        (recipe_id, recipe_features)
+        for recipe_id, recipe_features in load_features(candidates).items()
+        if recipe_id not in recipe_ids
+    )
+    candidate_ids = features.keys() - recipe_ids
+    frequencies.update(count_recipes(
+        set().union(*features.values()) - frequencies.keys()
+    ))
+    weights = get_weights(frequencies, total)
+    vectors = Vectors(
+        features, weights, get_candidate_features(frequencies, weights)
+    )
+
+    neighbors = {}
+    incoming = defaultdict(dict)
+    for recipe_id in recipe_ids:
+        scores = vectors.get_scores(recipe_id)
+        neighbors[recipe_id] = get_neighbors(scores)
+        for other_id, score in scores.items():
+            if other_id in candidate_ids:
+                incoming[other_id][recipe_id] = score
+    current = defaultdict(dict)
+    for recipe_id, similar_id, score in SimilarRecipe.objects.filter(
+            recipe_id__in=candidates
+    ).values_list('recipe_id', 'similar_id', 'score').iterator():
+        current[recipe_id][similar_id] = score
+    for recipe_id in candidate_ids:
+        scores = {
+            similar_id: score
+            for similar_id, score in current[recipe_id].items()
+            if similar_id not in recipe_ids
+        }
+        scores.update(incoming[recipe_id])
+        similar = get_neighbors(scores)
+        if dict(similar) != current[recipe_id]:
+            neighbors[recipe_id] = similar
+
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=neighbors).delete()
+        create_rows(neighbors.items())
+
+
+class SimilarRecipesQueue:
+    """
+    Обновление соседей в фоновом потоке, чтобы не держать запрос.
+    Изменённые рецепты копятся и обрабатываются одной пачкой,
+    пока поток занят. При SIMILAR_RECIPES_REFRESH = False таблицу
+    обновляет только build_similar_recipes по расписанию.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._running = False
+        self._executor = None
+
+    def add(self, recipe_ids):
+        if not settings.SIMILAR_RECIPES_REFRESH:
+            return
+        with self._lock:
+            self._pending.update(recipe_ids)
+            if self._running:
+                return
+            self._running = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='similar'
+                )
+        self._executor.submit(self._run)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                recipe_ids, self._pending = self._pending, set()
+                if not recipe_ids:
+                    self._running = False
+                    return
+            close_old_connections()
+            try:
+                refresh_similar_recipes(recipe_ids)
+            except Exception:
+                logger.exception('Не удалось обновить похожие рецепты')
+            finally:
+                close_old_connections()
+
+
+similar_recipes_queue = SimilarRecipesQueue()
@@ -0,0 +1,109 @@
+"""
+Чтение через синхронный WSGI и через ASGI с ASYNC_READ_API
+при медленных клиентах.
+
+Для каждого режима поднимает gunicorn с backend/gunicorn.conf.py
+(в режиме async — с UvicornWorker), запускает --slow-clients
+соединений, которые передают запрос по байту в течение
+--slow-seconds секунд, и одновременно гоняет сценарии load_test.py.
+Синхронный воркер занят медленным клиентом до конца запроса,
+асинхронный в это время обслуживает остальных:
+
+    python benchmarks/async_reads.py --workers 2 --slow-clients 16
+"""
+import argparse
+import socket
+import threading
+import time
+
+from common import start_server
+from load_test import SCENARIOS, Fixtures, login, report, run_scenario
+
+MODES = {
+    'sync': {
+        'GUNICORN_APP': 'backend.wsgi',
+        'GUNICORN_WORKER_CLASS': 'sync',
+    },
+    'async': {
+        'GUNICORN_APP': 'backend.asgi',
+        'GUNICORN_WORKER_CLASS': 'uvicorn.workers.UvicornWorker',
+        'ASYNC_READ_API': 'True',
+    },
+}
+
+
+def slow_client(port, seconds, stop):
+    """
+    Повторяет GET /api/recipes/, отправляя запрос по байту.
+    """
+    request = (
+        'GET /api/recipes/ HTTP/1.1\r\n'
+        'Host: 127.0.0.1\r\n'
+        'Connection: close\r\n\r\n'
+    ).encode()
+    delay = seconds / len(request)
+    while not stop.is_set():
+        try:
+            with socket.create_connection(('127.0.0.1', port)) as sock:
+                for position in range(len(request)):
+                    sock.sendall(request[position:position + 1])
+                    time.sleep(delay)
+                while sock.recv(65536):
+                    pass
+        except OSError:
+            time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--slow-clients', type=int, default=16)
+    parser.add_argument('--slow-seconds', type=float, default=2)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS,
+                        default=['tags', 'recipe_list', 'recipe_detail',
+                                 'subscriptions'])
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    results = {}
+    for mode, env in MODES.items():
+        server = start_server(args.port, {
+            **env, 'GUNICORN_WORKERS': str(args.workers)
+        })
+        stop = threading.Event()
+        try:
+            base_url = f'http://127.0.0.1:{args.port}'
+            clients = [login(base_url, number)
+                       for number in range(args.concurrency)]
+            fixtures = Fixtures(clients[0])
+            slow_clients = [
+                threading.Thread(
+                    target=slow_client,
+                    args=(args.port, args.slow_seconds, stop),
+                    daemon=True
+                ) for _ in range(args.slow_clients)
+            ]
+            for thread in slow_clients:
+                thread.start()
+            results[mode] = {
+                name: run_scenario(SCENARIOS[name][0], clients,
+                                   fixtures, args)
+                for name in args.scenarios
+            }
+        finally:
+            stop.set()
+            server.terminate()
+            server.wait()
+        print(f'{mode}, медленных клиентов: {args.slow_clients}')
+        report(results[mode], results.get('sync') if mode != 'sync'
+               else None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Общие для скриптов нагрузочного тестирования значения.
+"""
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / 'backend'
+BENCHMARK_DOMAIN = 'bench.example.com'
+BENCHMARK_PASSWORD = 'benchmark-password'
+TAGS = ('breakfast', 'lunch', 'dinner', 'dessert', 'vegan', 'quick')
+
+
+def start_server(port, env):
+    """
+    gunicorn с backend/gunicorn.conf.py и переменными env.
+    Возвращает процесс, когда сервер начал отвечать.
+    """
+    server = subprocess.Popen(
+        ('gunicorn', '--bind', f'127.0.0.1:{port}'),
+        cwd=BACKEND,
+        env={**os.environ, 'ALLOWED_HOSTS': '127.0.0.1', **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/tags/')
+            return server
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    server.terminate()
+    sys.exit('gunicorn не запустился.')
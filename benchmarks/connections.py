@@ -0,0 +1,59 @@
+"""
+Задержка лёгких запросов с новым соединением с БД на каждый запрос
+(DB_POOL_MODE=none) и с постоянными соединениями (persistent).
+
+Для каждого режима поднимает gunicorn с backend/gunicorn.conf.py
+и гоняет сценарии load_test.py. БД и данные те же, что у
+generate_data.py; разница заметна на Postgres, на SQLite
+соединение почти ничего не стоит:
+
+    python benchmarks/connections.py --workers 4 --duration 10
+"""
+import argparse
+
+from common import start_server
+from load_test import SCENARIOS, Fixtures, login, report, run_scenario
+
+MODES = ('none', 'persistent')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS,
+                        default=['tags', 'recipe_detail', 'ingredient_search'])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    args.concurrency = args.workers
+
+    results = {}
+    for mode in MODES:
+        server = start_server(args.port, {
+            'DB_POOL_MODE': mode,
+            'GUNICORN_WORKERS': str(args.workers),
+        })
+        try:
+            base_url = f'http://127.0.0.1:{args.port}'
+            clients = [login(base_url, number)
+                       for number in range(args.workers)]
+            fixtures = Fixtures(clients[0])
+            results[mode] = {
+                name: run_scenario(SCENARIOS[name][0], clients,
+                                   fixtures, args)
+                for name in args.scenarios
+            }
+        finally:
+            server.terminate()
+            server.wait()
+        print(f'DB_POOL_MODE={mode}')
+        report(results[mode], results.get(MODES[0]) if mode != MODES[0]
+               else None)
+
+
+if __name__ == '__main__':
+    main()
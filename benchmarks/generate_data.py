@@ -0,0 +1,208 @@
+"""
+Синтетические данные для нагрузочных тестов.
+
+Пользователи, подписки, рецепты с 3–12 ингредиентами из
+data/ingredients.csv и 1–3 тегами, избранное и списки покупок.
+При одинаковом --seed данные получаются одинаковыми, поэтому
+результаты load_test.py можно сравнивать между коммитами.
+
+Запуск из корня репозитория (БД берётся из тех же переменных
+окружения, что и у backend):
+
+    python benchmarks/generate_data.py --users 200 --recipes 5000
+
+Пользователи создаются с адресами bench<N>@bench.example.com
+и паролем BENCHMARK_PASSWORD; --clear удаляет их вместе с рецептами.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import transaction  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from common import BENCHMARK_DOMAIN, BENCHMARK_PASSWORD, TAGS  # noqa: E402
+
+BATCH_SIZE = 2000
+BENCHMARK_IMAGE = 'benchmark.png'
+COLORS = ('#E26C2D', '#49B64E', '#8775D2', '#F2C94C', '#27AE60', '#2F80ED')
+
+User = get_user_model()
+
+
+def batched(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def create_users(count):
+    # Хэш пароля считается один раз: на тысячах пользователей
+    # PBKDF2 занял бы минуты.
+    password = make_password(BENCHMARK_PASSWORD)
+    users = [
+        User(
+            email=f'bench{number}@{BENCHMARK_DOMAIN}',
+            username=f'bench{number}',
+            first_name='Bench',
+            last_name=str(number),
+            password=password
+        ) for number in range(count)
+    ]
+    for batch in batched(users):
+        User.objects.bulk_create(batch)
+    return list(User.objects.filter(
+        email__endswith=f'@{BENCHMARK_DOMAIN}'
+    ).order_by('id').values_list('id', flat=True))
+
+
+def create_subscriptions(rng, user_ids, per_user):
+    through = User.subscriptions.through
+    rows = [
+        through(from_customuser_id=user_id, to_customuser_id=author_id)
+        for user_id in user_ids
+        for author_id in rng.sample(user_ids, min(per_user, len(user_ids)))
+        if author_id != user_id
+    ]
+    for batch in batched(rows):
+        through.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def create_tags():
+    from recipes.models import Tag
+
+    Tag.objects.bulk_create(
+        (Tag(name=slug, color=color, slug=slug)
+         for slug, color in zip(TAGS, COLORS)),
+        ignore_conflicts=True
+    )
+    return list(Tag.objects.filter(slug__in=TAGS).values_list('id', flat=True))
+
+
+def create_image():
+    path = Path(settings.MEDIA_ROOT) / BENCHMARK_IMAGE
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        Image.new('RGB', (480, 320), '#E26C2D').save(path)
+
+
+def create_recipes(rng, count, user_ids, tag_ids, ingredient_ids):
+    from recipes.models import IngredientDetail, Recipe
+
+    through = Recipe.tags.through
+    for batch in batched(range(count)):
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author_id=rng.choice(user_ids),
+                name=f'Рецепт {number}',
+                text=f'Описание рецепта {number}. ' * rng.randint(1, 20),
+                image=BENCHMARK_IMAGE,
+                cooking_time=rng.randint(5, 180)
+            ) for number in batch
+        )
+        IngredientDetail.objects.bulk_create(
+            IngredientDetail(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            )
+            for recipe in recipes
+            for ingredient_id in rng.sample(
+                ingredient_ids, rng.randint(3, 12)
+            )
+        )
+        through.objects.bulk_create(
+            through(recipe_id=recipe.id, tag_id=tag_id)
+            for recipe in recipes
+            for tag_id in rng.sample(tag_ids, rng.randint(1, 3))
+        )
+
+
+def create_user_recipes(rng, model, user_ids, recipe_ids, low, high):
+    rows = [
+        model(user_id=user_id, recipe_id=recipe_id)
+        for user_id in user_ids
+        for recipe_id in rng.sample(
+            recipe_ids, min(rng.randint(low, high), len(recipe_ids))
+        )
+    ]
+    for batch in batched(rows):
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def clear():
+    User.objects.filter(email__endswith=f'@{BENCHMARK_DOMAIN}').delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--recipes', type=int, default=5000)
+    parser.add_argument('--subscriptions', type=int, default=10,
+                        help='Подписок на пользователя.')
+    parser.add_argument('--favorites', type=int, default=30,
+                        help='Наибольшее число избранных на пользователя.')
+    parser.add_argument('--cart', type=int, default=8,
+                        help='Наибольшее число рецептов в списке покупок.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--clear', action='store_true',
+                        help='Удалить данные прошлого запуска.')
+    args = parser.parse_args()
+
+    from api.cache import recipe_response_cache, tag_response_cache
+    from api.recipes.pantry import pantry_index
+    from api.recipes.personalization import invalidate_recipe_flags
+    from favorited.models import Favorite, ShoppingCart
+    from recipes.models import Ingredient, Recipe
+
+    rng = random.Random(args.seed)
+    if args.clear:
+        clear()
+    if User.objects.filter(email__endswith=f'@{BENCHMARK_DOMAIN}').exists():
+        sys.exit('Данные уже есть, запустите с --clear.')
+    call_command('load_data', 'ingredients.csv', stdout=io.StringIO())
+    ingredient_ids = list(
+        Ingredient.objects.order_by('id').values_list('id', flat=True)
+    )
+    create_image()
+    with transaction.atomic():
+        user_ids = create_users(args.users)
+        create_subscriptions(rng, user_ids, args.subscriptions)
+        tag_ids = create_tags()
+        create_recipes(rng, args.recipes, user_ids, tag_ids, ingredient_ids)
+        recipe_ids = list(Recipe.objects.filter(
+            author_id__in=user_ids
+        ).order_by('id').values_list('id', flat=True))
+        create_user_recipes(
+            rng, Favorite, user_ids, recipe_ids, 0, args.favorites
+        )
+        create_user_recipes(
+            rng, ShoppingCart, user_ids, recipe_ids, 1, args.cart
+        )
+    # bulk_create не отправляет сигналы: списки покупок, счётчики,
+    # похожие рецепты и кэши ответов обновляются вручную.
+    call_command('rebuild_shopping_lists', stdout=io.StringIO())
+    call_command('reconcile_recipe_counters', stdout=io.StringIO())
+    call_command('build_similar_recipes', stdout=io.StringIO())
+    tag_response_cache.invalidate()
+    recipe_response_cache.invalidate()
+    pantry_index.invalidate()
+    invalidate_recipe_flags(*user_ids)
+    print(f'Пользователей: {len(user_ids)}, рецептов: {len(recipe_ids)}')
+
+
+if __name__ == '__main__':
+    main()
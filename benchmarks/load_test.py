@@ -0,0 +1,285 @@
+"""
+Нагрузочный тест горячих путей API.
+
+Работает против запущенного сервера с данными из generate_data.py:
+
+    python backend/manage.py runserver --noreload
+    python benchmarks/load_test.py --base-url http://localhost:8000 \\
+        --concurrency 8 --duration 20 --output results.json
+
+Для каждого сценария печатает пропускную способность, ошибки
+и перцентили задержки. --compare сравнивает с сохранённым
+ранее --output, например с прогоном на предыдущем коммите.
+Нужна только стандартная библиотека.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from common import BENCHMARK_DOMAIN, BENCHMARK_PASSWORD, TAGS
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAA'
+    'CVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNo'
+    'AAAAggCByxOyYQAAAABJRU5ErkJggg=='
+)
+PERCENTILES = (50, 90, 95, 99)
+SEARCH_PREFIXES = ('мол', 'сах', 'кар', 'яйц', 'мук', 'сол', 'пер', 'мас')
+
+
+class Client:
+    def __init__(self, base_url, token=None):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+
+    def request(self, method, path, data=None):
+        body = None if data is None else json.dumps(data).encode()
+        request = urllib.request.Request(
+            self.base_url + path, data=body, method=method
+        )
+        request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header('Authorization', f'Token {self.token}')
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                content = response.read()
+                content_type = response.headers.get_content_type()
+        except urllib.error.HTTPError as error:
+            raise RuntimeError(f'{method} {path}: {error.code}')
+        if content_type == 'application/json':
+            return json.loads(content)
+        return content
+
+
+def login(base_url, number):
+    token = Client(base_url).request('POST', '/api/auth/token/login/', {
+        'email': f'bench{number}@{BENCHMARK_DOMAIN}',
+        'password': BENCHMARK_PASSWORD
+    })['auth_token']
+    return Client(base_url, token)
+
+
+class Fixtures:
+    """
+    id рецептов и ингредиентов для запросов, читаются через API.
+    """
+
+    def __init__(self, client):
+        self.recipe_ids = [
+            recipe['id'] for recipe in
+            client.request('GET', '/api/recipes/?limit=200')['results']
+        ]
+        self.ingredient_ids = [
+            ingredient['id'] for ingredient in
+            client.request('GET', '/api/ingredients/?name=%D0%B0')
+        ]
+        self.tag_ids = [
+            tag['id'] for tag in client.request('GET', '/api/tags/')
+        ]
+        if not self.recipe_ids or not self.ingredient_ids:
+            sys.exit('Нет данных: сначала запустите generate_data.py.')
+
+
+def tags(rng, client, fixtures):
+    client.request('GET', '/api/tags/')
+
+
+def recipe_list(rng, client, fixtures):
+    query = urllib.parse.urlencode(
+        [('tags', tag) for tag in rng.sample(TAGS, rng.randint(1, 2))]
+        + [('page', rng.randint(1, 20)), ('limit', 6)]
+    )
+    client.request('GET', f'/api/recipes/?{query}')
+
+
+def recipe_search(rng, client, fixtures):
+    query = urllib.parse.urlencode(
+        [('search', f'рецепт {rng.randint(0, 999)}')]
+        if rng.random() < 0.5 else
+        [('ingredients', ingredient_id)
+         for ingredient_id in rng.sample(fixtures.ingredient_ids, 2)]
+    )
+    client.request('GET', f'/api/recipes/?{query}')
+
+
+def recipe_detail(rng, client, fixtures):
+    client.request(
+        'GET', f'/api/recipes/{rng.choice(fixtures.recipe_ids)}/'
+    )
+
+
+def subscriptions(rng, client, fixtures):
+    client.request('GET', '/api/users/subscriptions/?recipes_limit=3')
+
+
+def shopping_list(rng, client, fixtures):
+    client.request('GET', '/api/recipes/download_shopping_cart/')
+
+
+def ingredient_search(rng, client, fixtures):
+    query = urllib.parse.urlencode({'name': rng.choice(SEARCH_PREFIXES)})
+    client.request('GET', f'/api/ingredients/?{query}')
+
+
+def recipe_write(rng, client, fixtures):
+    def payload():
+        return {
+            'name': f'Нагрузочный рецепт {uuid.uuid4().hex}',
+            'text': 'Создан load_test.py',
+            'cooking_time': rng.randint(5, 60),
+            'image': IMAGE,
+            'tags': rng.sample(fixtures.tag_ids, 1),
+            'ingredients': [
+                {'id': ingredient_id, 'amount': rng.randint(1, 300)}
+                for ingredient_id in rng.sample(fixtures.ingredient_ids, 5)
+            ]
+        }
+    recipe = client.request('POST', '/api/recipes/', payload())
+    try:
+        client.request('PATCH', f'/api/recipes/{recipe["id"]}/', payload())
+    finally:
+        client.request('DELETE', f'/api/recipes/{recipe["id"]}/')
+
+
+# Сценарий: (функция, нужен ли вход).
+SCENARIOS = {
+    'tags': (tags, True),
+    'recipe_list_anonymous': (recipe_list, False),
+    'recipe_list': (recipe_list, True),
+    'recipe_detail': (recipe_detail, True),
+    'recipe_search': (recipe_search, True),
+    'subscriptions': (subscriptions, True),
+    'shopping_list': (shopping_list, True),
+    'ingredient_search': (ingredient_search, False),
+    'recipe_write': (recipe_write, True),
+}
+
+
+def percentile(values, rank):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * rank / 100))]
+
+
+def run_scenario(scenario, clients, fixtures, args):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def worker(number):
+        rng = random.Random(args.seed + number)
+        client = clients[number % len(clients)]
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                scenario(rng, client, fixtures)
+            except Exception as error:
+                with lock:
+                    errors.append(str(error))
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(worker, range(args.concurrency)))
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    result = {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'throughput': len(latencies) / elapsed,
+        'max_ms': latencies[-1] * 1000 if latencies else 0,
+    }
+    for rank in PERCENTILES:
+        result[f'p{rank}_ms'] = percentile(latencies, rank) * 1000
+    if errors:
+        result['first_error'] = errors[0]
+    return result
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results, baseline=None):
+    columns = ('throughput',) + tuple(f'p{rank}_ms' for rank in PERCENTILES)
+    print(f'{"scenario":<24}{"req":>7}{"err":>5}'
+          + ''.join(f'{column:>14}' for column in columns))
+    for name, result in results.items():
+        line = f'{name:<24}{result["requests"]:>7}{result["errors"]:>5}'
+        for column in columns:
+            value = f'{result[column]:.1f}'
+            previous = (baseline or {}).get(name, {}).get(column)
+            if previous:
+                value += f' ({(result[column] / previous - 1) * 100:+.0f}%)'
+            line += f'{value:>14}'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS,
+                        default=list(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Секунд на сценарий.')
+    parser.add_argument('--users', type=int, default=10,
+                        help='Сколько пользователей generate_data.py '
+                             'используется для запросов с токеном.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Сохранить результаты в JSON.')
+    parser.add_argument('--compare', help='JSON прошлого прогона.')
+    args = parser.parse_args()
+
+    anonymous = [Client(args.base_url)]
+    authenticated = [login(args.base_url, number)
+                     for number in range(args.users)]
+    fixtures = Fixtures(authenticated[0])
+    results = {}
+    for name in args.scenarios:
+        scenario, needs_login = SCENARIOS[name]
+        results[name] = run_scenario(
+            scenario, authenticated if needs_login else anonymous,
+            fixtures, args
+        )
+        print(f'{name}: {results[name]["requests"]} запросов', flush=True)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+    report(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({
+                'commit': get_commit(),
+                'base_url': args.base_url,
+                'concurrency': args.concurrency,
+                'duration': args.duration,
+                'results': results
+            }, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
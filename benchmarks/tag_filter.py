@@ -0,0 +1,107 @@
+"""
+План и время фильтрации рецептов по тегам на растущем числе рецептов.
+
+Запуск из корня репозитория (БД берётся из тех же переменных
+окружения, что и у backend; данные пишутся во временную тестовую БД):
+
+    python benchmarks/tag_filter.py --recipes 1000 10000 100000 300000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.client import RequestFactory  # noqa: E402
+
+BATCH_SIZE = 5000
+TAGS = ('breakfast', 'lunch', 'dinner', 'dessert', 'vegan', 'quick')
+
+
+def grow(total, author, tags):
+    from recipes.models import Recipe
+
+    through = Recipe.tags.through
+    start = Recipe.objects.count()
+    for offset in range(start, total, BATCH_SIZE):
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'recipe {number}',
+                text=f'text {number}',
+                image='bench.jpg',
+                cooking_time=10
+            ) for number in range(offset, min(offset + BATCH_SIZE, total))
+        )
+        through.objects.bulk_create(
+            through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes
+            for tag in random.sample(tags, random.randint(1, 3))
+        )
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def filtered(query):
+    from api.filters import CustomFilter
+    from django.contrib.auth.models import AnonymousUser
+    from recipes.models import Recipe
+
+    request = RequestFactory().get('/api/recipes/', query)
+    request.user = AnonymousUser()
+    return CustomFilter(
+        request.GET, queryset=Recipe.objects.all(), request=request
+    ).qs
+
+
+def measure(queryset, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        list(queryset.values_list('id', flat=True)[:20])
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', nargs='+', type=int,
+                        default=(1000, 10000, 100000))
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    from django.contrib.auth import get_user_model
+    from recipes.models import Tag
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        author = get_user_model().objects.create(
+            email='bench@example.com', username='bench'
+        )
+        tags = [Tag.objects.create(name=slug, slug=slug) for slug in TAGS]
+        queries = {
+            'any': {'tags': ['vegan', 'quick']},
+            'all': {'tags': ['vegan', 'quick'], 'tags_mode': 'all'},
+        }
+        for total in sorted(args.recipes):
+            grow(total, author, tags)
+            for mode, query in queries.items():
+                queryset = filtered(query)
+                print(f'recipes={total} mode={mode} '
+                      f'{measure(queryset, args.repeat):.2f} ms/page')
+                print(queryset.values_list('id', flat=True)[:20].explain())
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()